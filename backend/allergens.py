@@ -0,0 +1,108 @@
+"""
+Allergen tagging for foods and meal templates
+Maps allergy keywords and their synonyms to bitsets, computed once per catalog load
+"""
+
+from text_tokens import tokenize
+
+# Allergen group -> words marking a food as containing it. Every word of
+# a keyword must start a word of the description ("almond" flags
+# "Almonds, raw"), the same rule search uses.
+ALLERGEN_GROUPS = {
+    'milk': ('milk', 'cheese', 'yogurt', 'yoghurt', 'cream', 'butter', 'whey', 'casein',
+             'lactose', 'ghee', 'kefir', 'custard', 'ricotta', 'mozzarella', 'cheddar', 'parmesan'),
+    'egg': ('egg', 'mayonnaise', 'meringue', 'omelet'),
+    'peanut': ('peanut',),
+    'tree nuts': ('almond', 'walnut', 'cashew', 'pecan', 'pistachio', 'hazelnut', 'macadamia',
+                  'brazil nut', 'pine nut', 'chestnut', 'nuts', 'praline', 'marzipan'),
+    'fish': ('fish', 'salmon', 'tuna', 'cod', 'trout', 'halibut', 'sardine', 'anchovy', 'tilapia',
+             'mackerel', 'herring', 'pollock', 'bass', 'catfish', 'haddock', 'snapper'),
+    'shellfish': ('shrimp', 'prawn', 'crab', 'lobster', 'crayfish', 'clam', 'mussel', 'oyster',
+                  'scallop', 'squid', 'calamari', 'octopus', 'shellfish'),
+    'soy': ('soy', 'soya', 'tofu', 'edamame', 'tempeh', 'miso'),
+    'wheat': ('wheat', 'bread', 'pasta', 'flour', 'tortilla', 'noodle', 'couscous', 'semolina',
+              'spelt', 'bulgur', 'cracker', 'barley', 'rye', 'seitan'),
+    'sesame': ('sesame', 'tahini'),
+}
+
+# Longer words that start like a keyword but are not the allergen
+KEYWORD_EXCEPTIONS = {
+    'egg': ('eggplant',),
+    'butter': ('butternut', 'butterbur'),
+    'cod': ('coda',),
+}
+
+# Words people type for a group -> the groups they mean
+ALLERGEN_ALIASES = {
+    'dairy': ('milk',),
+    'lactose': ('milk',),
+    'eggs': ('egg',),
+    'peanuts': ('peanut',),
+    'nut': ('tree nuts', 'peanut'),
+    'nuts': ('tree nuts', 'peanut'),
+    'tree nut': ('tree nuts',),
+    'seafood': ('fish', 'shellfish'),
+    'gluten': ('wheat',),
+    'soya': ('soy',),
+}
+
+ALLERGEN_BITS = {group: 1 << bit for bit, group in enumerate(ALLERGEN_GROUPS)}
+
+
+def resolve_allergies(allergies):
+    """
+    Split comma-separated allergy text into (bits, other_keywords): the
+    bitset of known groups named (directly or by an alias) and the
+    remaining keywords, which callers match as plain text.
+    """
+    bits = 0
+    other_keywords = []
+    for keyword in allergies.lower().split(','):
+        keyword = ' '.join(keyword.split())
+        if not keyword:
+            continue
+        groups = ALLERGEN_ALIASES.get(keyword) or ((keyword,) if keyword in ALLERGEN_BITS else ())
+        if groups:
+            for group in groups:
+                bits |= ALLERGEN_BITS[group]
+        else:
+            other_keywords.append(keyword)
+    return bits, other_keywords
+
+
+def _word_in_tokens(word, tokens):
+    exceptions = KEYWORD_EXCEPTIONS.get(word, ())
+    return any(
+        token.startswith(word) and not token.startswith(exceptions)
+        for token in tokens
+    )
+
+
+def text_bits(text):
+    """Bitset of the allergen groups whose keywords appear in text"""
+    tokens = set(tokenize(text))
+    bits = 0
+    for group, keywords in ALLERGEN_GROUPS.items():
+        if any(all(_word_in_tokens(word, tokens) for word in keyword.split()) for keyword in keywords):
+            bits |= ALLERGEN_BITS[group]
+    return bits
+
+
+def tag_foods(search_index, count):
+    """
+    Bitset per food (uint32 array of length count) of the allergen groups
+    its description matches, read off the search index's postings
+    """
+    # Imported here: only the JSON backend tags foods, so SQL mode never loads numpy
+    import numpy as np
+
+    bits = np.zeros(count, dtype=np.uint32)
+    for group, keywords in ALLERGEN_GROUPS.items():
+        for keyword in keywords:
+            matched = None
+            for word in keyword.split():
+                positions = search_index.prefix_postings(word, KEYWORD_EXCEPTIONS.get(word, ()))
+                matched = positions if matched is None else np.intersect1d(matched, positions, assume_unique=True)
+            if len(matched):
+                bits[matched] |= ALLERGEN_BITS[group]
+    return bits
@@ -0,0 +1,23 @@
+"""
+ASGI entry point for the Python backend
+
+    uvicorn asgi:application --port 5001
+
+A compatibility shim for hosts that only run ASGI apps. The Flask routes
+are synchronous and run unchanged on a bounded pool of threads behind
+a2wsgi's WSGIMiddleware, so this serves no faster than a threaded WSGI
+server. Run a single process: every uvicorn worker would load its own
+copy of the catalog. For several cores use gunicorn.conf.py, whose
+workers share one.
+"""
+
+import os
+
+from a2wsgi import WSGIMiddleware
+
+from server import create_app
+
+# Flask views running at once per process
+ASGI_THREADS = int(os.getenv('ASGI_THREADS', 10))
+
+application = WSGIMiddleware(create_app(), workers=ASGI_THREADS)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Search benchmark: ranked index search vs. the original linear scan
+
+Usage:
+    python bench_search.py [usda_foods.json] [--repeat 20] [--target-ms 10]
+
+Runs a fixed mix of queries (common words, multi-word, prefixes while
+typing, typos) through JsonDatabase.search and through a scan of every
+description, and reports p50/p95 latency for each. Exits non-zero when
+the ranked search p95 misses the target.
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from json_db import JsonDatabase
+
+QUERIES = [
+    # Common single words
+    'egg', 'chicken', 'milk', 'rice', 'apple',
+    # Multi-word
+    'chicken breast', 'egg whole raw', 'greek yogurt', 'olive oil', 'brown rice cooked',
+    # Prefixes, as typed into the search box
+    'c', 'ch', 'chi', 'chic', 'sp', 'spin',
+    # Typos
+    'brocoli', 'chiken', 'yougrt', 'spinnach', 'quinao', 'olvie oil'
+]
+
+
+def linear_scan(db, query, limit=20):
+    """The search used before the index: first `limit` substring matches in file order"""
+    query_words = query.lower().split()
+    results = []
+    for position, food in enumerate(db.foods):
+        description_lower = food.name.lower()
+        if all(word in description_lower for word in query_words):
+            results.append(db._to_dict(position))
+            if len(results) >= limit:
+                break
+    return results
+
+
+def measure(search, queries, repeat):
+    """Per-call latencies in milliseconds and the result count of each query"""
+    latencies = []
+    counts = {}
+    for _ in range(repeat):
+        for query in queries:
+            start = time.perf_counter()
+            results = search(query)
+            latencies.append((time.perf_counter() - start) * 1000)
+            counts[query] = len(results)
+    return np.array(latencies), counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark food search')
+    parser.add_argument('json_file', nargs='?', default='usda_foods.json')
+    parser.add_argument('--repeat', type=int, default=20, help='passes over the query mix')
+    parser.add_argument('--target-ms', type=float, default=10.0, help='p95 latency target for ranked search')
+    args = parser.parse_args()
+
+    db = JsonDatabase(args.json_file)
+    if not db.foods:
+        print("No foods loaded")
+        return 1
+
+    # Warm up lazily built structures (BM25 lengths, typo trigram table)
+    for query in QUERIES:
+        db.search(query)
+
+    ranked, ranked_counts = measure(db.search, QUERIES, args.repeat)
+    scan, scan_counts = measure(lambda q: linear_scan(db, q), QUERIES, max(1, args.repeat // 5))
+
+    print(f"\n{len(db.foods)} foods, {len(QUERIES)} queries")
+    print(f"{'':14}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for label, latencies in (('ranked', ranked), ('linear scan', scan)):
+        print(f"{label:14}{np.percentile(latencies, 50):>10.2f}"
+              f"{np.percentile(latencies, 95):>10.2f}{latencies.max():>10.2f}")
+
+    print(f"\n{'query':20}{'ranked':>8}{'scan':>8}")
+    for query in QUERIES:
+        print(f"{query:20}{ranked_counts[query]:>8}{scan_counts[query]:>8}")
+
+    p95 = np.percentile(ranked, 95)
+    print(f"\nRanked p95 {p95:.2f} ms vs target {args.target_ms:.2f} ms: "
+          f"{'OK' if p95 <= args.target_ms else 'MISSED'}")
+    return 0 if p95 <= args.target_ms else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Similar-foods benchmark: hashed index vs. exact search over every food
+
+Usage:
+    python bench_similar.py [usda_foods.json] [--queries 200] [--k 10] [--target-ms 5]
+
+Looks up the k most similar foods for a random sample of foods through
+the SimilarityIndex candidates and by comparing against the whole
+catalog, and reports p50/p95 latency for each, the recall@k of the index
+(share of the exact neighbors it also returns) and the candidates it
+ranks per query. Exits non-zero when the index p95 misses the target.
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from json_db import JsonDatabase
+
+
+def measure(index, rows, k, exact):
+    """Per-query latencies in milliseconds and the neighbors found"""
+    latencies = []
+    neighbors = []
+    for row in rows:
+        start = time.perf_counter()
+        found, _ = index.query(row, k, exact=exact)
+        latencies.append((time.perf_counter() - start) * 1000)
+        neighbors.append(found)
+    return np.array(latencies), neighbors
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark similar-food lookups')
+    parser.add_argument('json_file', nargs='?', default='usda_foods.json')
+    parser.add_argument('--queries', type=int, default=200, help='foods sampled as queries')
+    parser.add_argument('--k', type=int, default=10, help='neighbors per query')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--target-ms', type=float, default=5.0, help='p95 latency target for the index')
+    args = parser.parse_args()
+
+    db = JsonDatabase(args.json_file)
+    if not db.foods:
+        print("No foods loaded")
+        return 1
+
+    index = db.similarity_index
+    rng = np.random.default_rng(args.seed)
+    rows = rng.choice(len(index), size=min(args.queries, len(index)), replace=False)
+
+    hashed, hashed_neighbors = measure(index, rows, args.k, exact=False)
+    exact, exact_neighbors = measure(index, rows, args.k, exact=True)
+
+    recall = np.mean([
+        len(np.intersect1d(found, truth)) / max(len(truth), 1)
+        for found, truth in zip(hashed_neighbors, exact_neighbors)
+    ])
+    candidates = np.mean([len(index.candidates(index.vectors[row])) for row in rows])
+
+    tables, _, bits = index.projections.shape
+    print(f"\n{len(index)} foods, {len(rows)} queries, k={args.k}, {tables} tables x {bits} bits")
+    print(f"{'':10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for label, latencies in (('index', hashed), ('exact', exact)):
+        print(f"{label:10}{np.percentile(latencies, 50):>10.2f}"
+              f"{np.percentile(latencies, 95):>10.2f}{latencies.max():>10.2f}")
+    print(f"\nRecall@{args.k} {recall:.3f}, {candidates:.0f} candidates ranked per query "
+          f"({candidates / len(index):.1%} of the catalog)")
+
+    p95 = np.percentile(hashed, 95)
+    print(f"\nIndex p95 {p95:.2f} ms vs target {args.target_ms:.2f} ms: "
+          f"{'OK' if p95 <= args.target_ms else 'MISSED'}")
+    return 0 if p95 <= args.target_ms else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the Python backend, with machine-readable results
+
+Usage:
+    python bench_suite.py [--foods 100000] [--json-file catalog.json] [--output results.json]
+                          [--compare baseline.json] [--backend json|sql]
+
+JSON backend (default): generates a synthetic FDC catalog with
+synthetic_fdc.py unless --json-file is given (cached as
+synthetic_<foods>_<seed>.json in --work-dir, the temp directory by
+default; a --json-file is benchmarked through a link in --work-dir, so
+its own snapshot is left alone), then measures
+  - load: parse with and without a snapshot, load from the snapshot, each in
+    a fresh process with its peak RSS
+  - search: latency percentiles over bench_search.QUERIES
+  - get_by_id: latency percentiles for random ids
+  - normalize: JsonDatabase._normalize_food throughput
+  - suggest_meals: /api/suggest-meals end to end through the Flask test client
+
+SQL backend: search, id lookups and /api/suggest-meals through the Flask
+test client against the MySQL database configured in .env.
+
+Results are printed and, with --output, written as JSON. --compare reads
+an earlier output and reports every timing that got more than --threshold
+slower; the exit status is non-zero when any did.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from bench_search import QUERIES
+
+SUGGEST_MEAL_BODIES = [
+    {'deficiencies': [{'nutrient': 'iron'}, {'nutrient': 'protein'}], 'allergies': ''},
+    {'deficiencies': [{'nutrient': 'calcium'}, {'nutrient': 'fiber'}], 'allergies': 'milk, nuts'},
+    {'deficiencies': [{'nutrient': 'vitaminD'}, {'nutrient': 'vitaminB12'}], 'allergies': 'fish'},
+]
+
+# Result keys compared by --compare: lower is better for all of them
+TIMING_KEYS = ('seconds', 'p50_ms', 'p95_ms', 'p99_ms', 'peak_rss_mb')
+
+# Latency changes smaller than this are timer noise, whatever their percentage
+MIN_DELTA_MS = 0.05
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None where unsupported)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1 << 20 if sys.platform == 'darwin' else 1 << 10), 1)
+
+
+def percentiles(latencies_ms):
+    latencies = np.asarray(latencies_ms)
+    return {
+        'calls': len(latencies),
+        'p50_ms': round(float(np.percentile(latencies, 50)), 4),
+        'p95_ms': round(float(np.percentile(latencies, 95)), 4),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 4),
+        'max_ms': round(float(latencies.max()), 4)
+    }
+
+
+def timed(call, args_list, repeat=1):
+    """Per-call latencies in milliseconds of call(*args) over args_list, repeat times"""
+    latencies = []
+    for _ in range(repeat):
+        for args in args_list:
+            start = time.perf_counter()
+            call(*args)
+            latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def _measure_load(json_file, use_snapshot):
+    """Runs in a fresh process: load json_file once, report time and peak RSS"""
+    from json_db import JsonDatabase
+
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    db = JsonDatabase(json_file, use_snapshot=use_snapshot)
+    seconds = time.perf_counter() - start
+    return {'foods': len(db.foods), 'seconds': round(seconds, 4),
+            'peak_rss_mb': peak_rss_mb(), 'baseline_rss_mb': baseline}
+
+
+def bench_load(json_file):
+    """Load timings, each in a fresh process so peak RSS is its own"""
+    from snapshot import snapshot_path
+
+    shutil.rmtree(snapshot_path(json_file), ignore_errors=True)
+    context = multiprocessing.get_context('spawn')
+    results = {}
+    with context.Pool(1, maxtasksperchild=1) as pool:
+        results['parse'] = pool.apply(_measure_load, (json_file, False))
+    with context.Pool(1, maxtasksperchild=1) as pool:
+        results['parse_and_write_snapshot'] = pool.apply(_measure_load, (json_file, True))
+    with context.Pool(1, maxtasksperchild=1) as pool:
+        results['snapshot'] = pool.apply(_measure_load, (json_file, True))
+    return results
+
+
+def work_copy(json_file, work_dir):
+    """
+    json_file linked (or, where links are not allowed, copied) into
+    work_dir, so the snapshots built while benchmarking land there and
+    never replace the one next to the real catalog
+    """
+    path = os.path.join(work_dir, f"bench_{os.path.basename(json_file)}")
+    if os.path.lexists(path):
+        os.remove(path)
+    try:
+        os.symlink(os.path.abspath(json_file), path)
+    except OSError:
+        shutil.copyfile(json_file, path)
+    return path
+
+
+def bench_json(json_file, foods, seed, repeat):
+    from json_db import JsonDatabase
+    from synthetic_fdc import generate_foods
+
+    results = {'load': bench_load(json_file)}
+
+    db = JsonDatabase(json_file)
+    db.warm()
+    rng = np.random.default_rng(seed)
+
+    for query in QUERIES:
+        db.search(query)
+    results['search'] = percentiles(timed(db.search, [(query,) for query in QUERIES], repeat))
+
+    ids = db.food_ids[rng.integers(0, len(db.foods), size=1000)].tolist()
+    results['get_by_id'] = percentiles(timed(db.get_by_id, [(food_id,) for food_id in ids], repeat))
+
+    raw_foods = list(generate_foods(min(foods, 20000), seed + 1))
+    start = time.perf_counter()
+    for food in raw_foods:
+        db._normalize_food(food)
+    seconds = time.perf_counter() - start
+    results['normalize'] = {'foods': len(raw_foods), 'seconds': round(seconds, 4),
+                            'foods_per_second': round(len(raw_foods) / seconds)}
+
+    results['suggest_meals'] = bench_suggest_meals(db, repeat)
+    return results
+
+
+def bench_suggest_meals(db, repeat):
+    """/api/suggest-meals through the test client: first request (templates resolved) and warm ones"""
+    import server
+
+    if db is not None:
+        server.swap_json_db(db)
+    client = server.app.test_client()
+
+    start = time.perf_counter()
+    client.post('/api/suggest-meals', json=SUGGEST_MEAL_BODIES[0])
+    first_ms = (time.perf_counter() - start) * 1000
+
+    def post(body):
+        response = client.post('/api/suggest-meals', json=body)
+        assert response.status_code == 200, response.status_code
+
+    result = percentiles(timed(post, [(body,) for body in SUGGEST_MEAL_BODIES], repeat * 10))
+    result['first_request_ms'] = round(first_ms, 4)
+    return result
+
+
+def bench_sql(repeat, seed):
+    import server
+
+    client = server.app.test_client()
+    results = {}
+
+    def get(url):
+        response = client.get(url)
+        assert response.status_code in (200, 404), response.status_code
+        return response.get_json()
+
+    # Every response would otherwise come from the result cache after the first pass
+    server.result_cache.max_entries = 0
+
+    results['search'] = percentiles(timed(get, [(f'/api/foods/search/{query}',) for query in QUERIES if len(query) > 1], repeat))
+    foods = get('/api/foods') or []
+    ids = [food['id'] for food in foods]
+    if ids:
+        rng = np.random.default_rng(seed)
+        picks = rng.choice(ids, size=min(200, len(ids) * 4)).tolist()
+        results['get_by_id'] = percentiles(timed(get, [(f'/api/foods/{food_id}',) for food_id in picks], repeat))
+    results['suggest_meals'] = bench_suggest_meals(None, repeat)
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(results, prefix=''):
+    """{'search': {'p50_ms': 1}} -> {'search.p50_ms': 1}"""
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def compare(current, baseline, threshold):
+    """Print timing changes against baseline; returns the keys that regressed"""
+    now, before = flatten(current['results']), flatten(baseline['results'])
+    regressions = []
+    print(f"\nCompared with {baseline['meta'].get('commit') or 'baseline'} "
+          f"({baseline['meta'].get('foods')} foods):")
+    print(f"{'metric':45}{'before':>12}{'now':>12}{'change':>10}")
+    for key, value in now.items():
+        if key.rsplit('.', 1)[-1] not in TIMING_KEYS or not before.get(key) or value is None:
+            continue
+        change = value / before[key] - 1
+        flag = ''
+        if change > threshold and not (key.endswith('_ms') and value - before[key] < MIN_DELTA_MS):
+            flag = '  SLOWER'
+            regressions.append(key)
+        print(f"{key:45}{before[key]:>12.4g}{value:>12.4g}{change:>+10.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the Python backend')
+    parser.add_argument('--backend', choices=('json', 'sql'), default='json')
+    parser.add_argument('--foods', type=int, default=100000, help='synthetic catalog size')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json-file', help='benchmark this catalog instead of a synthetic one')
+    parser.add_argument('--work-dir', default=tempfile.gettempdir(),
+                        help='where synthetic catalogs and benchmark snapshots are kept')
+    parser.add_argument('--repeat', type=int, default=5, help='passes over each query mix')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--compare', help='earlier --output file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='slowdown that counts as a regression')
+    args = parser.parse_args()
+
+    # server.py reads this at import
+    os.environ['USE_JSON_DB'] = 'true' if args.backend == 'json' else 'false'
+
+    os.makedirs(args.work_dir, exist_ok=True)
+    json_file = args.json_file
+    if args.backend == 'json' and json_file:
+        json_file = work_copy(json_file, args.work_dir)
+    elif args.backend == 'json':
+        from synthetic_fdc import write_catalog
+
+        json_file = os.path.join(args.work_dir, f"synthetic_{args.foods}_{args.seed}.json")
+        if not os.path.exists(json_file):
+            print(f"Generating {args.foods} synthetic foods into {json_file}")
+            write_catalog(json_file, args.foods, args.seed)
+
+    meta = {
+        'backend': args.backend,
+        'commit': git_commit(),
+        'catalog': args.json_file or json_file,
+        'foods': args.foods if not args.json_file else None,
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z')
+    }
+
+    if args.backend == 'json':
+        results = bench_json(json_file, args.foods, args.seed, args.repeat)
+        meta['foods'] = results['load']['parse']['foods']
+    else:
+        results = bench_sql(args.repeat, args.seed)
+
+    report = {'meta': meta, 'results': results}
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
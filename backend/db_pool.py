@@ -0,0 +1,164 @@
+"""
+MySQL connection pool for the SQL backend mode
+Reuses connections across requests instead of a TCP+auth handshake per query
+"""
+
+import os
+import queue
+import threading
+import time
+
+
+def mysql_connector():
+    """mysql.connector, imported on first use so JSON mode never loads the driver"""
+    import mysql.connector
+    return mysql.connector
+
+
+def mysql_config_from_env():
+    """mysql.connector settings from the DB_* environment variables"""
+    return {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'port': int(os.getenv('DB_PORT', 3306)),
+        'user': os.getenv('DB_USER', 'root'),
+        'password': os.getenv('DB_PASSWORD', ''),
+        'database': os.getenv('DB_NAME', 'nutrition_db')
+    }
+
+
+class PooledConnection:
+    """
+    Wrapper around a pooled mysql.connector connection.
+    close() hands the connection back to the pool instead of closing it.
+    """
+
+    def __init__(self, pool, connection):
+        self._pool = pool
+        self._connection = connection
+        self._closed = False
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def is_connected(self):
+        return not self._closed and self._connection.is_connected()
+
+    def close(self):
+        """Return the connection to the pool (safe to call more than once)"""
+        if not self._closed:
+            self._closed = True
+            self._pool._release(self._connection)
+
+
+class ConnectionPool:
+    """
+    Fixed-size pool of MySQL connections.
+
+    Connections are opened lazily up to `size`. Callers wait up to
+    `timeout` seconds for a free one. A connection idle for longer than
+    `ping_interval` seconds is pinged (and reconnected if stale) before
+    it is handed out, and connections older than `recycle` seconds are
+    replaced so the server's wait_timeout never closes one under us.
+    """
+
+    def __init__(self, config, size=5, timeout=5.0, ping_interval=30.0, recycle=3600.0):
+        self.config = dict(config, autocommit=True)  # no stale REPEATABLE READ snapshots between requests
+        self.size = size
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        self.recycle = recycle
+
+        self._idle = queue.LifoQueue()  # (connection, last_used_at); LIFO keeps hot connections warm
+        self._slots = threading.BoundedSemaphore(size)
+        self._created_at = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            'created': 0,
+            'reused': 0,
+            'stale': 0,
+            'discarded': 0,
+            'timeouts': 0,
+            'errors': 0,
+            'in_use': 0
+        }
+
+    def _count(self, name, delta=1):
+        with self._lock:
+            self._stats[name] += delta
+
+    def _connect(self):
+        connection = mysql_connector().connect(**self.config)
+        self._created_at[id(connection)] = time.monotonic()
+        self._count('created')
+        return connection
+
+    def _discard(self, connection):
+        self._created_at.pop(id(connection), None)
+        self._count('discarded')
+        try:
+            connection.close()
+        except mysql_connector().Error:
+            pass
+
+    def _checkout_idle(self):
+        """Pop idle connections until a healthy one is found (or none are left)"""
+        while True:
+            try:
+                connection, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                return None
+
+            now = time.monotonic()
+            if now - self._created_at.get(id(connection), now) > self.recycle:
+                self._discard(connection)
+                continue
+
+            if now - last_used > self.ping_interval:
+                try:
+                    connection.ping(reconnect=True, attempts=1, delay=0)
+                except mysql_connector().Error:
+                    self._count('stale')
+                    self._discard(connection)
+                    continue
+
+            self._count('reused')
+            return connection
+
+    def get_connection(self):
+        """Borrow a connection, or None if none is free in time or MySQL is unreachable"""
+        if not self._slots.acquire(timeout=self.timeout):
+            self._count('timeouts')
+            print(f"MySQL pool exhausted: no connection free after {self.timeout}s")
+            return None
+
+        try:
+            connection = self._checkout_idle()
+            if connection is None:
+                connection = self._connect()
+        except mysql_connector().Error as e:
+            self._slots.release()
+            self._count('errors')
+            print(f"Error connecting to MySQL: {e}")
+            return None
+
+        self._count('in_use')
+        return PooledConnection(self, connection)
+
+    def _release(self, connection):
+        """Take back a borrowed connection"""
+        self._count('in_use', -1)
+        try:
+            if connection.is_connected():
+                self._idle.put((connection, time.monotonic()))
+            else:
+                self._discard(connection)
+        finally:
+            self._slots.release()
+
+    def stats(self):
+        """Pool counters for /api/health"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['size'] = self.size
+        stats['idle'] = self._idle.qsize()
+        return stats
@@ -0,0 +1,166 @@
+"""
+Streaming reader for USDA FDC JSON exports
+Yields foods one at a time so multi-GB files never sit in memory whole
+"""
+
+import json
+import re
+
+CHUNK_SIZE = 1 << 20  # characters read per refill
+
+# Top-level object keys that hold the food list, in order of preference
+FOOD_LIST_KEYS = ('foods', 'FoundationFoods')
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_decoder = json.JSONDecoder()
+
+
+class _StreamParser:
+    """Incremental JSON tokenizer over a text file using a sliding buffer"""
+
+    def __init__(self, f, on_chunk=None):
+        self.f = f
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self.chars_read = 0
+        self.on_chunk = on_chunk
+
+    def _fill(self):
+        """Append the next chunk, dropping what has been consumed"""
+        chunk = self.f.read(CHUNK_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        self.chars_read += len(chunk)
+        if self.on_chunk:
+            self.on_chunk(self.chars_read)
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Return the next non-whitespace character ('' at end of file)"""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char):
+        """Consume char or raise JSONDecodeError"""
+        if self.peek() != char:
+            raise json.JSONDecodeError(f"Expecting '{char}'", self.buf, self.pos)
+        self.pos += 1
+
+    def value(self):
+        """Decode one complete JSON value at the current position"""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number or literal touching the buffer end may be cut short
+            if end == len(self.buf) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def iter_array(self):
+        """Yield the items of the array at the current position one by one"""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.peek() == ',':
+                self.pos += 1
+                continue
+            self.expect(']')
+            return
+
+    def iter_object_keys(self):
+        """Yield the keys of the object at the current position; the caller consumes each value"""
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            yield key
+            if self.peek() == ',':
+                self.pos += 1
+                continue
+            self.expect('}')
+            return
+
+    def skip_value(self):
+        """Consume a value, streaming through containers instead of building them"""
+        char = self.peek()
+        if char == '[':
+            for _ in self.iter_array():
+                pass
+        elif char == '{':
+            for _ in self.iter_object_keys():
+                self.skip_value()
+        else:
+            self.value()
+
+
+def iter_foods(json_file_path, on_chunk=None):
+    """
+    Yield (list_key, food) for every food in an FDC export.
+
+    Recognizes the same layouts as JsonDatabase: a top-level list
+    (list_key None) or an object with a 'foods' or 'FoundationFoods'
+    list. Other top-level values are skipped without being materialized.
+    on_chunk, if given, is called with the number of characters read so
+    far after every chunk. Raises json.JSONDecodeError on malformed input.
+    """
+    with open(json_file_path, 'r', encoding='utf-8') as f:
+        parser = _StreamParser(f, on_chunk)
+        first = parser.peek()
+        if first == '[':
+            for food in parser.iter_array():
+                yield None, food
+        elif first == '{':
+            for key in parser.iter_object_keys():
+                if key in FOOD_LIST_KEYS and parser.peek() == '[':
+                    for food in parser.iter_array():
+                        yield key, food
+                else:
+                    parser.skip_value()
+        else:
+            parser.value()  # scalar document: nothing to load
+        if parser.peek():
+            raise json.JSONDecodeError('Extra data', parser.buf, parser.pos)
+
+
+def find_food_list(json_file_path, list_keys=FOOD_LIST_KEYS):
+    """
+    Locate the first food list of an FDC export without decoding it.
+
+    Returns (list_key, offset): the byte offset just past the list's '['
+    (list_key None for a top-level list), so callers can split the list
+    into byte ranges and decode them separately. None when the file has
+    no list under any of list_keys.
+    """
+    # latin-1 maps every byte to one character, so parser positions are
+    # byte offsets; the keys looked for are ASCII either way
+    with open(json_file_path, 'r', encoding='latin-1') as f:
+        parser = _StreamParser(f)
+        first = parser.peek()
+        if first == '[':
+            return None, parser.chars_read - len(parser.buf) + parser.pos + 1
+        if first == '{':
+            for key in parser.iter_object_keys():
+                if key in list_keys and parser.peek() == '[':
+                    return key, parser.chars_read - len(parser.buf) + parser.pos + 1
+                parser.skip_value()
+    return None
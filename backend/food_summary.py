@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Pre-pivoted food_summary table for the SQL backend mode
+
+Holds one wide row per food (22 nutrient columns) with a FULLTEXT index on
+the description, so searches read one indexed row per food instead of
+re-running the food_nutrient CASE pivot with a leading-wildcard LIKE.
+
+Maintenance:
+    python food_summary.py                      # first build, or add foods not yet summarized
+    python food_summary.py --since-id 2000000   # re-pivot foods with fdc_id > N
+    python food_summary.py --all                # re-pivot every food
+    python food_summary.py --prune              # also drop rows for deleted foods
+
+The first build fills a staging table and renames it into place. Later
+refreshes run in small fdc_id batches, each an upsert committed on its
+own, so the table stays readable (and the server keeps serving) while a
+new FDC release is loaded.
+"""
+
+import argparse
+import re
+import time
+
+from nutrients import NUTRIENT_CODE_MAP, NUTRIENT_NAMES
+
+TABLE = 'food_summary'
+MIN_FULLTEXT_WORD = 3  # InnoDB's default innodb_ft_min_token_size
+
+CREATE_TABLE_SQL = f"""
+    CREATE TABLE IF NOT EXISTS {{table}} (
+        fdc_id INT NOT NULL PRIMARY KEY,
+        description TEXT NOT NULL,
+        {', '.join(f'{name} DOUBLE NULL' for name in NUTRIENT_NAMES)},
+        refreshed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        FULLTEXT KEY ft_description (description)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+"""
+
+# Same pivot the server runs per request, restricted to one fdc_id range
+UPSERT_SQL = f"""
+    INSERT INTO {{table}} (fdc_id, description, {', '.join(NUTRIENT_NAMES)})
+    SELECT
+        f.fdc_id,
+        f.description,
+        {', '.join(f'MAX(CASE WHEN n.nutrient_id = {code} THEN fn.amount END)' for code in NUTRIENT_CODE_MAP)}
+    FROM food f
+    JOIN food_nutrient fn ON f.fdc_id = fn.fdc_id
+    JOIN nutrient n ON fn.nutrient_id = n.id
+    WHERE f.fdc_id > %s AND f.fdc_id <= %s {{only_missing}}
+    GROUP BY f.fdc_id, f.description
+    ON DUPLICATE KEY UPDATE
+        description = VALUES(description),
+        {', '.join(f'{name} = VALUES({name})' for name in NUTRIENT_NAMES)}
+"""
+
+ONLY_MISSING_SQL = "AND NOT EXISTS (SELECT 1 FROM {table} s WHERE s.fdc_id = f.fdc_id)"
+
+# Columns in the shape the API returns
+SELECT_SQL = f"""
+    SELECT fdc_id AS id, description AS name, '100 g' AS unit, {', '.join(NUTRIENT_NAMES)}
+    FROM {TABLE}
+"""
+
+_NON_WORD = re.compile(r'[^\w]+', re.UNICODE)
+
+
+def table_exists(cursor, table=TABLE):
+    """True when the table exists in the current database"""
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.tables "
+        "WHERE table_schema = DATABASE() AND table_name = %s",
+        (table,)
+    )
+    return cursor.fetchone()[0] > 0
+
+
+def search_sql(query, limit=20):
+    """
+    (sql, params) searching descriptions for all query words, as prefixes,
+    through the FULLTEXT index. Words shorter than the index's minimum
+    token size fall back to LIKE on the summary table.
+    """
+    words = [word for word in _NON_WORD.split(query.lower()) if word]
+    if words and all(len(word) >= MIN_FULLTEXT_WORD for word in words):
+        boolean_query = ' '.join(f'+{word}*' for word in words)
+        return (
+            f"{SELECT_SQL} WHERE MATCH(description) AGAINST (%s IN BOOLEAN MODE) "
+            f"ORDER BY MATCH(description) AGAINST (%s IN BOOLEAN MODE) DESC LIMIT {int(limit)}",
+            (boolean_query, boolean_query)
+        )
+    return f"{SELECT_SQL} WHERE description LIKE %s LIMIT {int(limit)}", (f'%{query}%',)
+
+
+def suggest_sql(prefix, limit=10):
+    """(sql, params) for autocomplete: id and name of foods matching every word as a prefix"""
+    words = [word for word in _NON_WORD.split(prefix.lower()) if word]
+    if words and all(len(word) >= MIN_FULLTEXT_WORD for word in words):
+        boolean_query = ' '.join(f'+{word}*' for word in words)
+        return (
+            f"SELECT fdc_id AS id, description AS name FROM {TABLE} "
+            f"WHERE MATCH(description) AGAINST (%s IN BOOLEAN MODE) "
+            f"ORDER BY MATCH(description) AGAINST (%s IN BOOLEAN MODE) DESC, CHAR_LENGTH(description) "
+            f"LIMIT {int(limit)}",
+            (boolean_query, boolean_query)
+        )
+    return (
+        f"SELECT fdc_id AS id, description AS name FROM {TABLE} "
+        f"WHERE description LIKE %s ORDER BY CHAR_LENGTH(description) LIMIT {int(limit)}",
+        (f'{prefix}%',)
+    )
+
+
+def by_ids_sql(food_ids):
+    """(sql, params) fetching summary rows by fdc_id"""
+    placeholders = ', '.join(['%s'] * len(food_ids))
+    return f"{SELECT_SQL} WHERE fdc_id IN ({placeholders})", tuple(food_ids)
+
+
+def page_sql(after=None, limit=50, columns=None):
+    """
+    (sql, params) for a keyset page: up to limit summary rows with fdc_id
+    greater than after (from the first row when None), in fdc_id order.
+    columns limits the nutrient columns selected (all when None).
+    """
+    names = NUTRIENT_NAMES if columns is None else [name for name in NUTRIENT_NAMES if name in columns]
+    select = ', '.join(['fdc_id AS id', 'description AS name', "'100 g' AS unit"] + list(names))
+    where, params = ('WHERE fdc_id > %s', (after,)) if after is not None else ('', ())
+    return f"SELECT {select} FROM {TABLE} {where} ORDER BY fdc_id LIMIT {int(limit)}", params
+
+
+def _next_batch_end(cursor, start, batch_size):
+    """Largest fdc_id among the next batch_size foods after start (None when done)"""
+    cursor.execute(
+        "SELECT MAX(fdc_id) FROM (SELECT fdc_id FROM food WHERE fdc_id > %s "
+        "ORDER BY fdc_id LIMIT %s) batch",
+        (start, batch_size)
+    )
+    return cursor.fetchone()[0]
+
+
+def refresh(connection, since_id=None, all_foods=False, prune=False, batch_size=1000):
+    """
+    Build or refresh food_summary batch by batch.
+
+    The first build fills a staging table and renames it into place, so
+    the server never sees a half-built food_summary. Later runs upsert in
+    place: by default only foods missing from the table are added (a new
+    FDC release); since_id re-pivots foods with a larger fdc_id, and
+    all_foods re-pivots everything. Returns the affected row count.
+    """
+    cursor = connection.cursor()
+    initial_build = not table_exists(cursor)
+    table = f'{TABLE}_build' if initial_build else TABLE
+    if initial_build:
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    cursor.execute(CREATE_TABLE_SQL.format(table=table))
+    connection.commit()
+
+    only_missing = not initial_build and not all_foods and since_id is None
+    upsert = UPSERT_SQL.format(table=table, only_missing=ONLY_MISSING_SQL.format(table=table) if only_missing else '')
+    start = since_id if since_id is not None and not initial_build else -1
+    written = 0
+
+    while True:
+        end = _next_batch_end(cursor, start, batch_size)
+        if end is None:
+            break
+        cursor.execute(upsert, (start, end))
+        connection.commit()
+        written += max(cursor.rowcount, 0)
+        start = end
+
+    if initial_build:
+        cursor.execute(f"RENAME TABLE {table} TO {TABLE}")
+    elif prune:
+        cursor.execute(
+            f"DELETE s FROM {TABLE} s LEFT JOIN food f ON f.fdc_id = s.fdc_id WHERE f.fdc_id IS NULL"
+        )
+        connection.commit()
+        print(f"Pruned {cursor.rowcount} rows for deleted foods")
+
+    cursor.close()
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build or refresh the food_summary table')
+    parser.add_argument('--since-id', type=int, help='re-pivot foods with fdc_id greater than this')
+    parser.add_argument('--all', action='store_true', help='re-pivot every food')
+    parser.add_argument('--prune', action='store_true', help='delete rows for foods no longer in food')
+    parser.add_argument('--batch-size', type=int, default=1000, help='foods per upsert batch')
+    args = parser.parse_args()
+
+    import mysql.connector
+    from dotenv import load_dotenv
+    from db_pool import mysql_config_from_env
+
+    load_dotenv()
+    connection = mysql.connector.connect(**mysql_config_from_env())
+    try:
+        start = time.time()
+        written = refresh(connection, since_id=args.since_id, all_foods=args.all,
+                          prune=args.prune, batch_size=args.batch_size)
+        # MySQL counts an upsert that changed a row as 2 affected rows
+        print(f"food_summary refreshed ({written} affected rows) in {time.time() - start:.1f}s")
+    finally:
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
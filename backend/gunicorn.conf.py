@@ -0,0 +1,83 @@
+"""
+Gunicorn settings for serving the Python backend on several cores
+
+    gunicorn -c gunicorn.conf.py 'server:create_app()'
+
+The app (and with it the food catalog) is loaded once in the master
+process and the workers are forked from it, so they share the loaded
+catalog copy-on-write instead of each loading their own copy.
+
+Catalog reloads happen only in the master, when its file watcher
+(JSON_DB_WATCH_INTERVAL) sees usda_foods.json change or when a worker's
+/api/admin/reload sends it catalog_reload_signal. Once the new catalog
+is loaded the master sends itself a HUP, which forks fresh workers from
+it and shuts the old ones down gracefully. All workers thus serve the
+same version and keep sharing it. The signal is USR2, so gunicorn's own
+USR2 (re-exec upgrade) is not available while serving the JSON catalog.
+"""
+
+import gc
+import multiprocessing
+import os
+import signal
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5001)}"
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+threads = int(os.getenv('GUNICORN_THREADS', 1))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
+
+# Load server.py, and the catalog, in the master before forking
+preload_app = True
+
+# Seconds the master waits for the catalog before forking workers anyway
+catalog_load_timeout = float(os.getenv('CATALOG_LOAD_TIMEOUT', 600))
+
+# Sent by a worker's /api/admin/reload to have the master reload the catalog
+catalog_reload_signal = signal.SIGUSR2
+
+
+def when_ready(server):
+    """Runs in the master after the app is loaded, before any worker is forked"""
+    import server as app_module
+
+    # create_app() loads the catalog in the background; finish it (search
+    # tables included) here, so workers inherit it instead of each loading
+    # (and dirtying) their own. A load that is stuck does not hold up the
+    # workers: each then loads its own copy.
+    if app_module.USE_JSON_DB and not app_module.wait_for_catalog(catalog_load_timeout):
+        server.log.warning("Catalog still loading after %.0f s; workers will load their own", catalog_load_timeout)
+
+    # Move everything loaded so far out of the garbage collector's reach:
+    # a collection in a worker would otherwise write to the header of every
+    # inherited object and un-share the pages holding them
+    gc.freeze()
+    server.log.info("%d objects frozen for copy-on-write sharing", gc.get_freeze_count())
+
+    if app_module.catalog_reloader:
+        # Reloads run here in the master: the watcher create_app() started,
+        # if any, and the workers' reload requests
+        app_module.catalog_reloader.add_listener(lambda: restart_workers(server))
+        signal.signal(catalog_reload_signal, lambda signum, frame: app_module.catalog_reloader.request())
+
+
+def restart_workers(server):
+    """After the master loads a new catalog: replace the workers with ones forked from it"""
+    # Collect what the old catalog left behind and freeze the new one
+    gc.unfreeze()
+    gc.collect()
+    gc.freeze()
+    server.log.info("Catalog reloaded; replacing workers")
+    # Handled by the arbiter's main loop, like `kill -HUP <master>`
+    os.kill(os.getpid(), signal.SIGHUP)
+
+
+def post_fork(server, worker):
+    """Runs in each worker right after it is forked"""
+    import server as app_module
+
+    # Only needed when the master gave up waiting for the catalog
+    app_module.start_catalog_load()
+
+    # Leave reloads to the master (see restart_workers())
+    if app_module.catalog_reloader:
+        app_module.reload_signal = catalog_reload_signal
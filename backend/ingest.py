@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""
+Build usda_foods.json from raw USDA FDC exports in one parallel pass
+
+Usage:
+    python ingest.py FoodData_Central_foundation_food_json.json [more exports...]
+                     [--output usda_foods.json] [--workers N] [--chunk-mb 16] [--snapshot]
+
+Does the work of scripts/trim-json.js, remove-chains.js and
+remove-applebees.js in a single pass: drops branded foods and
+chain/restaurant items, keeps only the NUTRIENT_CODE_MAP nutrients and
+normalizes foodPortions, writing the trimmed {"foods": [...]} file the
+server loads. Foods keep their order, so the output is the same for any
+number of workers.
+
+The food list of each export is split into byte ranges that worker
+processes read, decode and trim on their own, so decoding (most of the
+cost) runs on every core. --snapshot also compiles the catalog snapshot
+(see snapshot.py) from the trimmed foods, so the server's first start
+skips parsing the output.
+"""
+
+import argparse
+import codecs
+import collections
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+from array import array
+
+import numpy as np
+
+from fdc_stream import FOOD_LIST_KEYS, find_food_list
+from json_db import NUTRIENT_CODE_MAP, FoodRecord, JsonDatabase
+from snapshot import save_snapshot
+
+# Food lists of the raw FDC downloads (Foundation, SR Legacy, Survey, Branded)
+RAW_FOOD_LIST_KEYS = FOOD_LIST_KEYS + ('SRLegacyFoods', 'SurveyFoods', 'BrandedFoods')
+
+# Brand/restaurant patterns of trim-json.js, checked against description and brand owner
+BRANDS_REGEX = re.compile(
+    r"PIZZA HUT|PAPA JOHN|PAPA JOHNS|PAPAJOHNS|MCDONALD|BURGER KING|WENDY|DOMINO|KFC|TACO BELL|"
+    r"SUBWAY|STARBUCKS|CHIPOTLE|PIZZA|RESTAURANT|HUT|JOHNS|MCDONALD'S",
+    re.IGNORECASE
+)
+
+# Chains of remove-chains.js, checked against description and category
+CHAIN_PATTERNS = (
+    "PIZZA HUT", "PAPA JOHN", "PAPA JOHNS", "PAPAJOHNS", "DOMINO", "DOMINO'S", "MCDONALD", "MCDONALD'S",
+    "BURGER KING", "WENDY", "KFC", "TACO BELL", "SUBWAY", "STARBUCKS", "CHIPOTLE", "POPEYES", "APPLEBEE",
+    "P.F. CHANG", "P F CHANG", "PANERA", "IHOP", "DUNKIN", "DUNKIN'", "SHAKE SHACK", "CARLS JR", "CARL'S JR",
+    "SONIC", "JACK IN THE BOX", "PIZZERIA", "RESTAURANT", "BRANDED", "COMMERCIAL", "COMMERCIALY PREPARED",
+    "COMMERCIALLY PREPARED"
+)
+CHAIN_REGEX = re.compile('|'.join(re.escape(pattern) for pattern in CHAIN_PATTERNS), re.IGNORECASE)
+
+# remove-applebees.js
+APPLEBEES_REGEX = re.compile('applebee', re.IGNORECASE)
+
+NUTRIENT_NUMBERS = {str(code): code for code in NUTRIENT_CODE_MAP}
+
+CHUNK_MB = 16
+
+# Text decoded past a range's end while looking for the end of its last food
+LOOKAHEAD = 1 << 20
+READ_SIZE = 1 << 20
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+# '{' opening an array item: a guess at where a food starts, checked by decoding
+_ITEM_START = re.compile(r'[,\[][ \t\n\r]*(\{)')
+_decoder = json.JSONDecoder()
+
+
+def nutrient_code(nutrient):
+    """
+    NUTRIENT_CODE_MAP code of a foodNutrients entry, or None. Prefers the
+    nutrient number ('208') as trim-json.js does: in full FDC exports
+    nutrient.id is FDC's own id (1008), not the code.
+    """
+    inner = nutrient.get('nutrient') or {}
+    number = inner.get('number') or nutrient.get('number') or nutrient.get('nutrientNumber')
+    if number is not None:
+        return NUTRIENT_NUMBERS.get(str(number))
+    code = nutrient.get('nutrientId')
+    return code if code in NUTRIENT_CODE_MAP else None
+
+
+def trim_nutrients(nutrients):
+    """Keep NUTRIENT_CODE_MAP nutrients as {'nutrient': {'number', 'name'}, 'amount'}"""
+    trimmed = []
+    for nutrient in nutrients if isinstance(nutrients, list) else ():
+        if not isinstance(nutrient, dict):
+            continue
+        code = nutrient_code(nutrient)
+        if code is None:
+            continue
+        amount = nutrient.get('amount')
+        if amount is None:
+            amount = nutrient.get('value', 0)
+        entry = {'number': str(code)}
+        name = (nutrient.get('nutrient') or {}).get('name') or nutrient.get('name')
+        if name:
+            entry['name'] = name
+        trimmed.append({'nutrient': entry, 'amount': amount})
+    return trimmed
+
+
+def normalize_portion(portion):
+    """A foodPortions entry reduced to gramWeight, label, amount and measureUnit, as trim-json.js does"""
+    if not portion:
+        return None
+    unit = portion.get('measureUnit')
+    unit_name = unit.get('name') if isinstance(unit, dict) else None
+    gram_weight = portion.get('gramWeight')
+    amount = portion.get('amount')
+    if amount is None:
+        amount = portion.get('value', 1)
+    return {
+        'gramWeight': float(gram_weight) if gram_weight is not None else None,
+        'label': portion.get('modifier') or portion.get('amount') or unit_name or None,
+        'amount': amount,
+        'measureUnit': unit_name or None
+    }
+
+
+def trim_food(food):
+    """(trimmed food, None) or (None, reason it was excluded)"""
+    description = str(food.get('description') or '')
+    data_type = str(food.get('dataType') or food.get('data_type') or '')
+    if 'branded' in data_type.lower():
+        return None, 'branded'
+    # trim-json.js and remove-chains.js read the brand from different fields
+    brand_name = food.get('brandOwner') or food.get('brand_name')
+    if brand_name and BRANDS_REGEX.search(str(brand_name)):
+        return None, 'brand'
+    brand = str(food.get('brandOwner') or food.get('brand_owner') or food.get('brand') or '')
+    if CHAIN_REGEX.search(brand) or APPLEBEES_REGEX.search(brand):
+        return None, 'brand'
+    if CHAIN_REGEX.search(data_type):
+        return None, 'chain'
+    if BRANDS_REGEX.search(description) or CHAIN_REGEX.search(description):
+        return None, 'chain'
+
+    category = food.get('foodCategory')
+    if isinstance(category, dict):
+        category = category.get('description') or category
+    if isinstance(category, str) and CHAIN_REGEX.search(category):
+        return None, 'chain'
+    if APPLEBEES_REGEX.search(description):
+        return None, 'chain'
+
+    fdc_id = food.get('fdcId')
+    if fdc_id is None:
+        fdc_id = food.get('fdc_id', food.get('ndbNumber'))
+    portions = food.get('foodPortions')
+    return {
+        'fdcId': fdc_id,
+        'description': food.get('description') or 'Unknown',
+        'foodCategory': category or None,
+        'foodPortions': [p for p in map(normalize_portion, portions) if p] if isinstance(portions, list) else [],
+        'foodNutrients': trim_nutrients(food.get('foodNutrients'))
+    }, None
+
+
+class _RangeReader:
+    """
+    The text of bytes [start, end) of a file, decoded past end on demand,
+    since the last food starting before end usually finishes after it.
+    start and end must fall on UTF-8 character boundaries.
+    """
+
+    def __init__(self, f, start, end):
+        self.f = f
+        self.utf8 = codecs.getincrementaldecoder('utf-8')()
+        f.seek(start)
+        self.text = self.utf8.decode(f.read(end - start))
+        self.length = len(self.text)  # characters belonging to this range
+        self.eof = False
+
+    def ensure(self, size):
+        """Decode further until the text is size characters long (or the file ends)"""
+        chunks = [self.text]
+        available = len(self.text)
+        while available < size and not self.eof:
+            block = self.f.read(READ_SIZE)
+            self.eof = not block
+            chunks.append(self.utf8.decode(block, final=self.eof))
+            available += len(chunks[-1])
+        self.text = ''.join(chunks)
+
+    def char(self, pos):
+        """The first non-whitespace character at or after pos, and its position"""
+        self.ensure(pos + 1)
+        pos = _WHITESPACE.match(self.text, pos).end()
+        while pos == len(self.text) and not self.eof:
+            self.ensure(pos + READ_SIZE)
+            pos = _WHITESPACE.match(self.text, pos).end()
+        return self.text[pos:pos + 1], pos
+
+    def decode(self, pos, strict):
+        """
+        Decode the value at pos. A food bigger than LOOKAHEAD is only
+        decoded when strict; otherwise (pos was a guess) the error propagates.
+        """
+        lookahead = LOOKAHEAD
+        while True:
+            self.ensure(pos + lookahead)
+            try:
+                return _decoder.raw_decode(self.text, pos)
+            except json.JSONDecodeError:
+                if not strict or self.eof:
+                    raise
+                lookahead *= 2
+
+    def guess_item_start(self):
+        """Position of the first '{' in this range that decodes to a food, or None"""
+        for match in _ITEM_START.finditer(self.text, 0, self.length):
+            pos = match.start(1)
+            try:
+                value, _ = self.decode(pos, strict=False)
+            except json.JSONDecodeError:
+                continue
+            # Nested objects (nutrients, portions) decode too; foods carry foodNutrients
+            if isinstance(value, dict) and 'foodNutrients' in value:
+                return pos
+        return None
+
+
+_compactor = None
+
+
+def _compact(food):
+    """FoodRecord fields and nutrient values, exactly as JsonDatabase stores the food"""
+    global _compactor
+    if _compactor is None:
+        # Only the stateless _compact_food is used, so skip loading anything
+        _compactor = JsonDatabase.__new__(JsonDatabase)
+    record, values = _compactor._compact_food(food)
+    return (record.id, record.name, record.portions), values
+
+
+def ingest_range(task):
+    """
+    Trim the foods that start in one byte range of a food list.
+
+    task is (path, start, end, first, compile): first is the position
+    (in characters from start) of the first food, or None to guess it.
+    A guess can land inside a food; the caller checks 'first' against
+    where the previous range left off and reruns the range from there
+    when they differ. 'next' is where the first food of the next range
+    starts (from end), None once the list has ended ('done').
+    """
+    path, start, end, first, compile_records = task
+    result = {'length': 0, 'first': first, 'next': None, 'done': False, 'aligned': True, 'read': 0,
+              'excluded': collections.Counter(), 'lines': [], 'records': [], 'values': array('d')}
+    strict = first is not None
+    with open(path, 'rb') as f:
+        reader = _RangeReader(f, start, end)
+        result['length'] = reader.length
+        pos = first if strict else reader.guess_item_start()
+        result['first'] = pos
+        if pos is None or pos >= reader.length:
+            return result
+
+        try:
+            while True:
+                char, pos = reader.char(pos)
+                if char == ']':
+                    result['done'] = True
+                    break
+                food, pos = reader.decode(pos, strict)
+                if not isinstance(food, dict):
+                    raise ValueError(f"expected a food object at {start + pos} in {path}")
+                result['read'] += 1
+                trimmed, reason = trim_food(food)
+                if trimmed is None:
+                    result['excluded'][reason] += 1
+                else:
+                    result['lines'].append(json.dumps(trimmed, ensure_ascii=False, separators=(',', ':')))
+                    if compile_records:
+                        record, values = _compact(trimmed)
+                        result['records'].append(record)
+                        result['values'].extend(values)
+
+                char, pos = reader.char(pos)
+                if char == ']':
+                    result['done'] = True
+                    break
+                if char != ',':
+                    raise json.JSONDecodeError("Expecting ',' delimiter", reader.text, pos)
+                _, pos = reader.char(pos + 1)
+                if pos >= reader.length:
+                    result['next'] = pos - reader.length
+                    break
+        except (json.JSONDecodeError, ValueError):
+            if strict:
+                raise
+            # The guessed start was inside a food
+            result['aligned'] = False
+    return result
+
+
+def _char_boundary(f, offset):
+    """offset, moved forward past any UTF-8 continuation bytes"""
+    f.seek(offset)
+    for byte in f.read(4):
+        if byte & 0xC0 != 0x80:
+            break
+        offset += 1
+    return offset
+
+
+def plan_ranges(path, chunk_bytes):
+    """Split the food list of path into (start, end) byte ranges; [] when it has none"""
+    found = find_food_list(path, RAW_FOOD_LIST_KEYS)
+    if found is None:
+        print(f"⚠ No food list in {path}, skipping")
+        return []
+    _, start = found
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        bounds = [start] + [_char_boundary(f, offset) for offset in range(start + chunk_bytes, size, chunk_bytes)]
+    bounds = sorted(set(bounds)) + [size]
+    return list(zip(bounds, bounds[1:]))
+
+
+def ingest(inputs, output, workers=None, chunk_mb=CHUNK_MB, compile_snapshot=False):
+    """Trim the raw exports into output (and its snapshot); returns a summary dict"""
+    start_time = time.perf_counter()
+    tasks = []
+    for path in inputs:
+        ranges = plan_ranges(path, int(chunk_mb * (1 << 20)))
+        for i, (start, end) in enumerate(ranges):
+            # The first range of a list starts right after its '['
+            tasks.append((path, start, end, 0 if i == 0 else None, compile_snapshot))
+
+    workers = workers or os.cpu_count() or 1
+    pool = multiprocessing.Pool(workers) if workers > 1 and len(tasks) > 1 else None
+    results = pool.imap(ingest_range, tasks) if pool else map(ingest_range, tasks)
+
+    read, kept, rerun = 0, 0, 0
+    excluded = collections.Counter()
+    records, values = [], array('d')
+    temp_output = f"{output}.tmp-{os.getpid()}"
+    try:
+        with open(temp_output, 'w', encoding='utf-8') as out:
+            out.write('{"foods":[')
+            path, expected, done = None, 0, True
+            for task, result in zip(tasks, results):
+                if task[0] != path:
+                    if not done:
+                        raise ValueError(f"food list in {path} is not terminated")
+                    path, expected, done = task[0], 0, False
+                if done:
+                    continue
+                if expected >= result['length']:
+                    # No food starts in this range
+                    expected -= result['length']
+                    continue
+                if not result['aligned'] or result['first'] != expected:
+                    result = ingest_range(task[:3] + (expected, task[4]))
+                    rerun += 1
+
+                read += result['read']
+                excluded.update(result['excluded'])
+                for line in result['lines']:
+                    out.write(',\n' if kept else '\n')
+                    out.write(line)
+                    kept += 1
+                records.extend(result['records'])
+                values.extend(result['values'])
+                done = result['done']
+                expected = result['next']
+            if not done:
+                raise ValueError(f"food list in {path} is not terminated")
+            out.write('\n]}\n')
+        os.replace(temp_output, output)
+    finally:
+        if pool:
+            pool.terminate()
+        if os.path.exists(temp_output):
+            os.remove(temp_output)
+
+    summary = {
+        'read': read,
+        'kept': kept,
+        'excluded': dict(excluded),
+        'ranges': len(tasks),
+        'reruns': rerun,
+        'workers': workers if pool else 1,
+        'seconds': round(time.perf_counter() - start_time, 3),
+        'output_mb': round(os.path.getsize(output) / (1 << 20), 1)
+    }
+
+    if compile_snapshot:
+        foods = [FoodRecord(*record) for record in records]
+        nutrient_values = np.frombuffer(values, dtype=np.float64).reshape(len(foods), len(NUTRIENT_CODE_MAP))
+        save_snapshot(output, JsonDatabase.from_records(foods, nutrient_values))
+        summary['seconds_with_snapshot'] = round(time.perf_counter() - start_time, 3)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build usda_foods.json from raw USDA FDC exports')
+    parser.add_argument('inputs', nargs='+', help='raw FDC JSON exports, ingested in order')
+    parser.add_argument('--output', '-o', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'usda_foods.json'))
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: one per core)')
+    parser.add_argument('--chunk-mb', type=float, default=CHUNK_MB, help='size of the byte ranges handed to workers')
+    parser.add_argument('--snapshot', action='store_true', help='also compile the catalog snapshot')
+    args = parser.parse_args()
+
+    try:
+        summary = ingest(args.inputs, args.output, args.workers, args.chunk_mb, args.snapshot)
+    except (OSError, ValueError) as e:
+        # json.JSONDecodeError is a ValueError
+        print(f"Ingest failed: {e}")
+        return 1
+
+    print(f"Read {summary['read']} foods, kept {summary['kept']} "
+          f"(excluded: {', '.join(f'{n} {reason}' for reason, n in summary['excluded'].items()) or 'none'})")
+    print(f"Wrote {args.output} ({summary['output_mb']} MB) in {summary['seconds']} s "
+          f"with {summary['workers']} worker(s), {summary['ranges']} ranges, {summary['reruns']} rerun")
+    if args.snapshot:
+        print(f"Snapshot compiled; {summary['seconds_with_snapshot']} s in total")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,169 +4,578 @@ JSON Database module for ATE Nutrition Tracking App
 Equivalent to jsonDb.js - handles USDA FDC JSON format
 """
 
+import bisect
+import itertools
 import json
+import os
+import sys
+from array import array
 
-# USDA FDC Nutrient Code Mapping
-NUTRIENT_CODE_MAP = {
-    208: 'calories',
-    203: 'protein',
-    205: 'carbs',
-    204: 'fat',
-    291: 'fiber',
-    269: 'sugar',
-    301: 'calcium',
-    303: 'iron',
-    304: 'magnesium',
-    305: 'phosphorus',
-    306: 'potassium',
-    307: 'sodium',
-    309: 'zinc',
-    320: 'vitaminA',
-    401: 'vitaminC',
-    328: 'vitaminD',
-    323: 'vitaminE',
-    430: 'vitaminK',
-    415: 'vitaminB6',
-    418: 'vitaminB12',
-    417: 'folate',
-    406: 'niacin'
+import numpy as np
+
+import allergens
+import metrics
+from fdc_stream import FOOD_LIST_KEYS, iter_foods
+from nutrients import NUTRIENT_CODE_MAP, NUTRIENT_NAMES
+from search_index import SearchIndex
+from similar import SimilarityIndex
+from snapshot import load_snapshot, save_snapshot
+
+# Column order of JsonDatabase.nutrient_matrix
+NUTRIENT_COLUMNS = {name: column for column, name in enumerate(NUTRIENT_NAMES)}
+
+# Comparison operators accepted by JsonDatabase.rank filters
+FILTER_OPS = {
+    'lt': np.less,
+    'lte': np.less_equal,
+    'gt': np.greater,
+    'gte': np.greater_equal,
+    'eq': np.equal
 }
 
+# Serving options every food offers. Shared by all results, so treat as read-only.
+DEFAULT_SERVING_OPTIONS = (
+    {'label': 'grams', 'unit': 'g', 'gramsPerUnit': 1, 'gramWeight': 1},
+    {'label': 'oz', 'unit': 'oz', 'gramsPerUnit': 28.35, 'gramWeight': 28.35},
+    {'label': 'lb', 'unit': 'lb', 'gramsPerUnit': 453.59, 'gramWeight': 453.59},
+    {'label': 'serving (100g)', 'unit': 'serving', 'gramsPerUnit': 100, 'gramWeight': 100},
+)
+
+# Field order of the tuples in FoodRecord.portions
+PORTION_FIELDS = ('label', 'unit', 'amount', 'gramWeight', 'gramsPerUnit', 'modifier', 'description')
+
+
+def _intern(value):
+    """Intern repeated short strings such as portion units and labels"""
+    return sys.intern(value) if type(value) is str else value
+
+
+def safe_float(value, default=0.0):
+    """Safely convert value to float"""
+    try:
+        return float(value) if value is not None else default
+    except (ValueError, TypeError):
+        return default
+
+
+def _id_sort_key(food_id):
+    """Total order over fdcIds of mixed types: integers ascending, then the rest by their string"""
+    return (0, food_id, '') if type(food_id) is int else (1, 0, str(food_id))
+
+
+class FoodRecord:
+    """
+    Compact normalized food. Nutrient values are not stored here; they live
+    in JsonDatabase.nutrient_values at the same row.
+    """
+    
+    __slots__ = ('id', 'name', 'portions')
+    
+    def __init__(self, food_id, name, portions=()):
+        self.id = food_id
+        self.name = name
+        self.portions = portions  # tuple of PORTION_FIELDS tuples
+    
+    def serving_options(self):
+        """The default serving options followed by this food's portions"""
+        serving_options = list(DEFAULT_SERVING_OPTIONS)
+        serving_options.extend(dict(zip(PORTION_FIELDS, portion)) for portion in self.portions)
+        return serving_options
+    
+    def to_dict(self, nutrient_values):
+        """Expand into the app's food format, given values in NUTRIENT_NAMES order"""
+        normalized = {
+            'id': self.id,
+            'name': self.name,
+            'unit': '100 g',
+            'servingOptions': self.serving_options()
+        }
+        normalized.update(zip(NUTRIENT_NAMES, nutrient_values))
+        return normalized
+
 
 class JsonDatabase:
     """JSON-based food database using USDA FDC format"""
     
-    def __init__(self, json_file_path):
-        """Initialize database from JSON file"""
+    # Source of JsonDatabase.generation; unique across instances
+    _generations = itertools.count(1)
+    
+    def __init__(self, json_file_path, use_snapshot=True, progress=None):
+        """
+        Initialize database from JSON file (or its compiled snapshot).
+        progress, if given, is called as progress(phase, fraction) while
+        loading: 'snapshot', 'parsing' (fraction of the file read),
+        'indexing' and 'writing snapshot'.
+        """
         self.foods = []
+        self.nutrient_values = np.zeros((0, len(NUTRIENT_NAMES)))
+        self.use_snapshot = use_snapshot
+        self.progress = progress
+        self._build_indexes()
         self.load_from_file(json_file_path)
     
+    @classmethod
+    def from_records(cls, foods, nutrient_values):
+        """
+        Build a database from foods compacted elsewhere (e.g. by ingest.py):
+        FoodRecords and their float64 rows in NUTRIENT_NAMES order
+        """
+        db = cls.__new__(cls)
+        db.use_snapshot = False
+        db.progress = None
+        db.generation = next(cls._generations)
+        db.foods = foods
+        db.nutrient_values = nutrient_values
+        db._build_indexes()
+        return db
+    
+    def _report(self, phase, fraction=None):
+        if self.progress:
+            self.progress(phase, fraction)
+    
     def load_from_file(self, json_file_path):
-        """Load foods from JSON file"""
+        """Load foods from JSON file and normalize them once up front"""
+        with metrics.span('json_db.load'):
+            self._load_from_file(json_file_path)
+    
+    def _load_from_file(self, json_file_path):
+        # Lets callers tell when cached results derived from this database go stale
+        self.generation = next(self._generations)
+        
+        if self.use_snapshot:
+            self._report('snapshot')
+            if self._load_snapshot(json_file_path):
+                return
+        
+        parsed = False
+        foods, values = [], array('d')
         try:
-            with open(json_file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                
-                # Handle different JSON structures
-                if isinstance(data, list):
-                    self.foods = data
-                elif isinstance(data, dict) and 'foods' in data:
-                    self.foods = data['foods']
-                elif isinstance(data, dict) and 'FoundationFoods' in data:
-                    self.foods = data['FoundationFoods']
-                else:
-                    self.foods = []
-                
-                print(f"Loaded {len(self.foods)} foods from JSON database")
+            size = max(os.path.getsize(json_file_path), 1)
+            self._report('parsing', 0.0)
+            
+            # Stream foods one at a time and keep only the compact record;
+            # a top-level list wins, then 'foods', then 'FoundationFoods'
+            foods_by_key = {}
+            skipped = 0
+            on_chunk = lambda chars: self._report('parsing', min(chars / size, 1.0))
+            for list_key, food in iter_foods(json_file_path, on_chunk if self.progress else None):
+                key_foods, key_values = foods_by_key.setdefault(list_key, ([], array('d')))
+                try:
+                    record, nutrient_values = self._compact_food(food)
+                except Exception as e:
+                    # One malformed food must not cost the rest of the catalog
+                    if not skipped:
+                        print(f"Skipping malformed food in {json_file_path}: {e}")
+                    skipped += 1
+                    continue
+                key_foods.append(record)
+                key_values.extend(nutrient_values)
+            if skipped:
+                print(f"Skipped {skipped} malformed foods")
+            
+            for list_key in (None,) + FOOD_LIST_KEYS:
+                if list_key in foods_by_key:
+                    foods, values = foods_by_key[list_key]
+                    break
+            
+            parsed = True
+            print(f"Loaded {len(foods)} foods from JSON database")
         except FileNotFoundError:
             print(f"JSON file not found: {json_file_path}")
-            self.foods = []
+            foods, values = [], array('d')
         except json.JSONDecodeError as e:
             print(f"Error parsing JSON: {e}")
-            self.foods = []
+            foods, values = [], array('d')
         except Exception as e:
             print(f"Error loading JSON database: {e}")
-            self.foods = []
+            foods, values = [], array('d')
+        
+        self.foods = foods
+        # Exact float64 values for responses, one row per food
+        self.nutrient_values = np.frombuffer(values, dtype=np.float64).reshape(len(foods), len(NUTRIENT_NAMES))
+        self._report('indexing')
+        self._build_indexes()
+        
+        if self.use_snapshot and parsed:
+            self._report('writing snapshot')
+            try:
+                save_snapshot(json_file_path, self)
+            except Exception as e:
+                print(f"Could not write snapshot for {json_file_path}: {e}")
     
-    def _extract_nutrient(self, food, nutrient_code):
-        """Extract nutrient value from food object"""
-        nutrients = food.get('foodNutrients', [])
+    def _load_snapshot(self, json_file_path):
+        """Adopt a valid compiled snapshot of json_file_path, if there is one"""
+        snapshot = load_snapshot(json_file_path, FoodRecord)
+        if snapshot is None:
+            return False
+        
+        self.foods = snapshot['foods']
+        self.nutrient_values = snapshot['nutrient_values']
+        self.nutrient_matrix = snapshot['nutrient_matrix']
+        self.food_ids = snapshot['food_ids']
+        self._search_index = snapshot['search_index']
+        self.similarity_index = snapshot['similarity_index']
+        self._build_id_index()
+        self._tag_allergens()
+        print(f"Loaded {len(self.foods)} foods from snapshot of {json_file_path}")
+        return True
+    
+    def _build_indexes(self):
+        """Build the search index and nutrient columns for the loaded foods"""
+        self._search_index = SearchIndex.build(food.name for food in self.foods)
+        
+        # One float32 row per food for analytics, columns in NUTRIENT_NAMES order
+        self.nutrient_matrix = self.nutrient_values.astype(np.float32)
+        # Row -> fdcId, aligned with self.foods and nutrient_matrix
+        ids = [food.id for food in self.foods]
+        self.food_ids = np.array(ids, dtype=np.int64 if all(type(i) is int for i in ids) else object)
+        self._build_id_index()
+        self._tag_allergens()
+        # Nearest-neighbor index over the nutrient profiles, for similar()
+        self.similarity_index = SimilarityIndex.build(self.nutrient_values)
+    
+    def _tag_allergens(self):
+        """Bitset of allergen groups per food (see allergens.ALLERGEN_GROUPS)"""
+        self.allergen_bits = allergens.tag_foods(self._search_index, len(self.foods))
+    
+    def _build_id_index(self):
+        """Build the fdcId -> row dict from food_ids"""
+        # Insert in reverse so the first food with a given id wins, as in a linear scan
+        ids = self.food_ids.tolist()
+        self._id_index = dict(zip(reversed(ids), range(len(ids) - 1, -1, -1)))
+        self._id_order = None
+    
+    def _sorted_ids(self):
+        """
+        Unique fdcIds in ascending order, the row of each (the first food
+        with it) and, when the ids are not all integers, their sort keys
+        (see _id_sort_key()), built on first use
+        """
+        if self._id_order is None:
+            if self.food_ids.dtype == object:
+                # Mixed int/str ids do not compare, so np.unique cannot sort them
+                items = sorted(self._id_index.items(), key=lambda item: _id_sort_key(item[0]))
+                ids = np.empty(len(items), dtype=object)
+                ids[:] = [food_id for food_id, _ in items]
+                rows = np.array([row for _, row in items], dtype=np.int64)
+                self._id_order = ids, rows, [_id_sort_key(food_id) for food_id in ids.tolist()]
+            else:
+                self._id_order = (*np.unique(self.food_ids, return_index=True), None)
+        return self._id_order
+    
+    def _extract_nutrients(self, food):
+        """Extract all mapped nutrients in a single pass over foodNutrients"""
+        values = {}
+        nutrients = food.get('foodNutrients') or []
         for nutrient in nutrients:
+            if not isinstance(nutrient, dict):
+                continue
             # Handle different field names
-            nutrient_id = nutrient.get('nutrientId') or nutrient.get('nutrient', {}).get('id')
+            info = nutrient.get('nutrient')
+            if not isinstance(info, dict):
+                info = {}
+            nutrient_id = nutrient.get('nutrientId') or info.get('id')
             # Also handle 'number' field (as string)
             if not nutrient_id:
-                nutrient_number = nutrient.get('nutrient', {}).get('number')
+                nutrient_number = info.get('number')
                 if nutrient_number:
                     try:
                         nutrient_id = int(nutrient_number)
                     except (ValueError, TypeError):
                         pass
             
-            if nutrient_id == nutrient_code:
+            # First entry for a code wins, matching the old per-code lookup
+            if nutrient_id in NUTRIENT_CODE_MAP and nutrient_id not in values:
                 amount = nutrient.get('amount') or nutrient.get('value', 0)
-                return float(amount) if amount is not None else 0.0
-        return 0.0
+                # Amounts such as "<0.1" count as 0
+                values[nutrient_id] = safe_float(amount)
+        return values
     
-    def _normalize_food(self, food):
-        """Convert USDA food format to app format"""
+    def _compact_portion(self, portion):
+        """Convert one foodPortions entry to a PORTION_FIELDS tuple"""
+        label = portion.get('label') or portion.get('portionDescription') or portion.get('modifier') or 'serving'
+        amount = portion.get('amount', 1.0)
+        if type(amount) not in (int, float):
+            amount = safe_float(amount, 1.0)
+        gram_weight = portion.get('gramWeight', 100.0)
+        if type(gram_weight) not in (int, float):
+            # trim-json.js writes null when FDC has no gram weight
+            gram_weight = safe_float(gram_weight, 100.0)
+        
+        return (
+            _intern(f"{amount} {label}" if amount != 1.0 else label),
+            _intern(label),
+            amount,
+            gram_weight,
+            gram_weight / amount if amount > 0 else gram_weight,
+            _intern(portion.get('modifier', '')),
+            _intern(portion.get('portionDescription', ''))
+        )
+    
+    def _compact_food(self, food):
+        """Convert USDA food format to a FoodRecord plus its nutrient values"""
         # Extract basic info
         food_id = food.get('fdcId') or food.get('fdc_id') or food.get('id', 0)
         description = food.get('description') or food.get('name', 'Unknown Food')
         
-        # Build normalized food object with both static and food-specific serving options
-        normalized = {
-            'id': food_id,
-            'name': description,
-            'unit': '100 g',
-            'servingOptions': [
-                {'label': 'grams', 'unit': 'g', 'gramsPerUnit': 1, 'gramWeight': 1},
-                {'label': 'oz', 'unit': 'oz', 'gramsPerUnit': 28.35, 'gramWeight': 28.35},
-                {'label': 'lb', 'unit': 'lb', 'gramsPerUnit': 453.59, 'gramWeight': 453.59},
-                {'label': 'serving (100g)', 'unit': 'serving', 'gramsPerUnit': 100, 'gramWeight': 100},
-            ]
-        }
+        # Food-specific serving options from foodPortions
+        portions = tuple(
+            self._compact_portion(portion) for portion in food.get('foodPortions') or [] if isinstance(portion, dict)
+        )
         
         # Extract all nutrients using the mapping
-        for code, name in NUTRIENT_CODE_MAP.items():
-            normalized[name] = self._extract_nutrient(food, code)
-        
-        # Add food-specific serving options from foodPortions
-        portions = food.get('foodPortions', [])
-        for portion in portions:
-            label = portion.get('label') or portion.get('portionDescription') or portion.get('modifier') or 'serving'
-            amount = portion.get('amount', 1.0)
-            gram_weight = portion.get('gramWeight', 100.0)
-            
-            serving_option = {
-                'label': f"{amount} {label}" if amount != 1.0 else label,
-                'unit': label,
-                'amount': amount,
-                'gramWeight': gram_weight,
-                'gramsPerUnit': gram_weight / amount if amount > 0 else gram_weight,
-                'modifier': portion.get('modifier', ''),
-                'description': portion.get('portionDescription', '')
-            }
-            normalized['servingOptions'].append(serving_option)
+        values = self._extract_nutrients(food)
+        nutrient_values = [values.get(code, 0.0) for code in NUTRIENT_CODE_MAP]
         
-        return normalized
+        return FoodRecord(food_id, description, portions), nutrient_values
+    
+    def _normalize_food(self, food):
+        """Convert USDA food format to app format"""
+        record, nutrient_values = self._compact_food(food)
+        return record.to_dict(nutrient_values)
+    
+    def _to_dict(self, row):
+        """Expand the stored food at row into app format"""
+        return self.foods[row].to_dict(self.nutrient_values[row].tolist())
     
     def search(self, query, limit=20):
-        """Search foods by text query - matches all words in any order"""
+        """
+        Search foods by text query - matches all words in any order,
+        best match first, tolerating small typos (see SearchIndex.search)
+        """
         if not query:
             return []
         
-        query_lower = query.lower().strip()
-        # Split query into words for flexible matching
-        query_words = query_lower.split()
-        results = []
-        
-        for food in self.foods:
-            description = food.get('description', '') or food.get('name', '')
-            description_lower = description.lower()
+        with metrics.span('json_db.search'):
+            positions = self._search_index.search(query, limit)
+            if positions is not None:
+                return [self._to_dict(position) for position in positions]
             
-            # Check if all query words are present in the description
-            if all(word in description_lower for word in query_words):
-                results.append(self._normalize_food(food))
-                if len(results) >= limit:
-                    break
-        
-        return results
+            # No indexable characters (e.g. "%"): plain substring scan in file order
+            query_words = query.lower().split()
+            results = []
+            for position, food in enumerate(self.foods):
+                description_lower = food.name.lower()
+                if all(word in description_lower for word in query_words):
+                    results.append(self._to_dict(position))
+                    if len(results) >= limit:
+                        break
+            
+            return results
+    
+    def suggest(self, prefix, limit=10):
+        """Autocomplete: id and name of the best matches for a typed prefix"""
+        return [
+            {'id': self.foods[position].id, 'name': self.foods[position].name}
+            for position in self._search_index.suggest(prefix, limit)
+        ]
+    
+    def warm(self):
+        """Precompute lazily built search structures and the broadest (one and two letter) suggestions"""
+        self._search_index.warm()
     
     def get_by_id(self, food_id):
         """Get food by ID"""
-        for food in self.foods:
-            fdc_id = food.get('fdcId') or food.get('fdc_id') or food.get('id')
-            if fdc_id == food_id:
-                return self._normalize_food(food)
-        return None
+        row = self._id_index.get(food_id)
+        return self._to_dict(row) if row is not None else None
     
-    def get_all(self, limit=50):
-        """Get all foods (limited)"""
+    def get_many(self, food_ids):
+        """Get foods for a list of IDs, in request order, skipping unknown IDs"""
+        rows = [row for row in map(self._id_index.get, food_ids) if row is not None]
+        return self.project(rows)
+    
+    def similar(self, food_id, limit=10, exact=False):
+        """
+        Foods with the closest nutrient profile to food_id, nearest first,
+        each with its 'distance' (in standard deviations, see similar.py).
+        exact=True skips the index and compares against every food.
+        Returns None for an unknown food_id.
+        """
+        row = self._id_index.get(food_id)
+        if row is None:
+            return None
+        rows, distances = self.similarity_index.query(row, limit, exact=exact)
         results = []
-        for food in self.foods[:limit]:
-            results.append(self._normalize_food(food))
+        for position, distance in zip(rows.tolist(), distances.tolist()):
+            food = self._to_dict(position)
+            food['distance'] = round(distance, 4)
+            results.append(food)
         return results
+    
+    def get_all(self, limit=50):
+        """Get all foods (limited), in fdcId order"""
+        return self.page(limit=limit)[0]
+    
+    def page(self, after=None, limit=50, fields=None):
+        """
+        Keyset page over fdcIds: up to limit foods with an fdcId greater
+        than after (from the first food when None) in fdcId order (integer
+        ids before any others, see _id_sort_key()), and the cursor for the
+        next page (None after the last food). fields picks
+        the keys of each food; all of them when None (see project()).
+        """
+        ids, rows, keys = self._sorted_ids()
+        if after is None:
+            start = 0
+        elif keys is not None:
+            start = bisect.bisect_right(keys, _id_sort_key(after))
+        elif type(after) is int:
+            start = int(np.searchsorted(ids, after, side='right'))
+        else:
+            # Non-integer ids sort after integer ones (see _id_sort_key())
+            start = len(ids)
+        end = min(start + max(limit, 0), len(ids))
+        next_cursor = ids[end - 1:end].tolist()[0] if start < end < len(ids) else None
+        return self.project(rows[start:end], fields), next_cursor
+    
+    def project(self, rows, fields=None):
+        """
+        Foods at rows in app format, keeping only fields (id, name, unit,
+        servingOptions and nutrient names) when given, so a few columns do
+        not cost building every nutrient and serving option
+        """
+        with metrics.span('json_db.project'):
+            return self._project(rows, fields)
+    
+    def _project(self, rows, fields):
+        rows = np.asarray(rows, dtype=np.int64)
+        if fields is None:
+            return [self._to_dict(row) for row in rows.tolist()]
+        
+        names = [name for name in fields if name in NUTRIENT_COLUMNS]
+        values = self.nutrient_values[np.ix_(rows, [NUTRIENT_COLUMNS[name] for name in names])].tolist()
+        foods = []
+        for row, row_values in zip(rows.tolist(), values):
+            record = self.foods[row]
+            food = dict(zip(names, row_values))
+            if 'id' in fields:
+                food['id'] = record.id
+            if 'name' in fields:
+                food['name'] = record.name
+            if 'unit' in fields:
+                food['unit'] = '100 g'
+            if 'servingOptions' in fields:
+                food['servingOptions'] = record.serving_options()
+            foods.append(food)
+        return foods
+    
+    def _nutrient_column(self, name):
+        """Return the nutrient_matrix column for a nutrient name"""
+        if name not in NUTRIENT_COLUMNS:
+            raise ValueError(f"Unknown nutrient: {name}")
+        return self.nutrient_matrix[:, NUTRIENT_COLUMNS[name]]
+    
+    def rank(self, sort_by, per=None, filters=None, descending=True, limit=20):
+        """
+        Rank foods by a nutrient column using vectorized operations.
+        
+        sort_by: nutrient to rank on (per 100 g)
+        per: optional nutrient to normalize by, e.g. per='calories' ranks
+             sort_by per 100 kcal; foods with none of it are skipped
+        filters: list of (nutrient, op, value) with op in FILTER_OPS,
+                 e.g. [('sodium', 'lt', 140), ('protein', 'gt', 10)]
+        
+        Returns normalized foods with an added 'score' field.
+        """
+        scores = self._nutrient_column(sort_by)
+        mask = np.ones(len(self.foods), dtype=bool)
+        
+        if per:
+            denominator = self._nutrient_column(per)
+            mask &= denominator > 0
+            scores = np.divide(scores, denominator, out=np.zeros_like(scores), where=mask) * 100
+        
+        for name, op, value in filters or []:
+            if op not in FILTER_OPS:
+                raise ValueError(f"Unknown filter operator: {op}")
+            mask &= FILTER_OPS[op](self._nutrient_column(name), value)
+        
+        rows = np.flatnonzero(mask)
+        if limit <= 0 or rows.size == 0:
+            return []
+        
+        keys = -scores[rows] if descending else scores[rows]
+        # Partial selection of the top `limit`, then sort just those
+        if limit < rows.size:
+            top = np.argpartition(keys, limit - 1)[:limit]
+        else:
+            top = np.arange(rows.size)
+        top = top[np.argsort(keys[top], kind='stable')]
+        
+        return [
+            dict(self._to_dict(row), score=round(float(scores[row]), 4))
+            for row in rows[top]
+        ]
+
+    
+    def keyword_mask(self, keywords):
+        """
+        Bool mask over foods whose description matches any keyword, where
+        every word of a keyword must start a word of the description
+        (so "nut" flags "Nuts, mixed" but not "Coconut")
+        """
+        mask = np.zeros(len(self.foods), dtype=bool)
+        for keyword in keywords:
+            positions = self._search_index.candidates(keyword.split())
+            if positions is not None:
+                mask[positions] = True
+        return mask
+    
+    def allergen_mask(self, allergies):
+        """
+        Bool mask over foods to avoid for comma-separated allergy text:
+        known allergens and their synonyms ("nuts", "dairy") by the
+        precomputed bitsets, anything else by keyword_mask
+        """
+        bits, other_keywords = allergens.resolve_allergies(allergies)
+        mask = (self.allergen_bits & bits) != 0
+        if other_keywords:
+            mask |= self.keyword_mask(other_keywords)
+        return mask
+    
+    def grams_per_unit(self, row, serving):
+        """
+        Grams in one unit of a serving option of the food at row: a number
+        is taken as grams itself, a string is looked up by serving option
+        label. Returns None for an unknown label.
+        """
+        if isinstance(serving, (int, float)):
+            return float(serving)
+        for option in DEFAULT_SERVING_OPTIONS:
+            if option['label'] == serving:
+                return float(option['gramsPerUnit'])
+        grams_column = PORTION_FIELDS.index('gramsPerUnit')
+        for portion in self.foods[row].portions:
+            if portion[0] == serving:
+                return float(portion[grams_column])
+        return None
+    
+    def totals(self, items):
+        """
+        Total all nutrients over a list of (food_id, serving, quantity)
+        items in one matrix product. serving is grams per unit, a serving
+        option label, or None for the 100 g the nutrient values are per;
+        like the app, an unknown label also counts as 100 g.
+        
+        Returns (totals by nutrient name, ids not found).
+        """
+        rows = []
+        grams = []
+        unknown_ids = []
+        for food_id, serving, quantity in items:
+            row = self._id_index.get(food_id)
+            if row is None:
+                unknown_ids.append(food_id)
+                continue
+            per_unit = self.grams_per_unit(row, serving) if serving is not None else None
+            rows.append(row)
+            grams.append(quantity * (per_unit if per_unit is not None else 100.0))
+        
+        totals = np.zeros(len(NUTRIENT_NAMES))
+        if rows:
+            # Values are per 100 g
+            totals = (np.asarray(grams) / 100.0) @ self.nutrient_values[np.asarray(rows)]
+        return dict(zip(NUTRIENT_NAMES, totals.tolist())), unknown_ids
 
 
 # Standalone test function
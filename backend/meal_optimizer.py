@@ -0,0 +1,152 @@
+"""
+Meal optimizer for the JSON food database
+Picks foods and portion sizes from the whole catalog to close nutrient deficits
+"""
+
+import time
+
+import numpy as np
+
+# Portion sizes tried for every candidate food, in grams
+PORTION_GRAMS = np.array([50.0, 100.0, 150.0, 200.0])
+
+# Foods ranked ahead of time per nutrient, and how many of them (after
+# exclusions) each request considers per deficit nutrient
+POOL_SIZE = 1000
+CANDIDATES_PER_NUTRIENT = 150
+
+# Calories per 100 g assumed for foods that list fewer, so foods with
+# missing energy data do not look infinitely efficient
+MIN_CALORIES_PER_100G = 40.0
+
+# Calories charged per food added on top of its own, so the greedy pick
+# prefers a bigger portion of one food over many tiny ones
+ITEM_PENALTY_CALORIES = 100.0
+
+# Stop adding foods once the best one closes less than this share of the deficits
+MIN_GAIN = 0.01
+
+
+class MealOptimizer:
+    """
+    Greedy meal builder over a foods x nutrients matrix (values per 100 g).
+
+    Building one ranks, for every nutrient column, the POOL_SIZE foods
+    with the most of it per calorie. That ranking does not depend on the
+    request, so candidate pruning per request only walks these short
+    lists instead of scanning the catalog.
+    """
+
+    def __init__(self, values, calorie_column):
+        """Rank foods per nutrient; values is the database's nutrient array"""
+        self.values = values
+        self.calories = np.asarray(values[:, calorie_column], dtype=np.float64)
+        billed = np.maximum(self.calories, MIN_CALORIES_PER_100G)
+
+        self.pools = []
+        for column in range(values.shape[1]):
+            density = np.asarray(values[:, column], dtype=np.float64) / billed
+            count = min(POOL_SIZE, len(density))
+            top = np.argpartition(density, len(density) - count)[len(density) - count:] if count else np.arange(0)
+            top = top[density[top] > 0]
+            self.pools.append(top[np.argsort(-density[top], kind='stable')])
+
+    def candidate_rows(self, columns, excluded=None, per_nutrient=CANDIDATES_PER_NUTRIENT):
+        """
+        Rows worth considering: the densest per_nutrient foods per calorie
+        for each deficit column, skipping rows set in the excluded mask
+        """
+        rows = []
+        for column in columns:
+            pool = self.pools[column]
+            if excluded is not None:
+                pool = pool[~excluded[pool]]
+            rows.append(pool[:per_nutrient])
+        if not rows:
+            return np.arange(0)
+        return np.unique(np.concatenate(rows))
+
+    def optimize_meal(self, deficits, calorie_cap, rows, max_foods=5, deadline=None):
+        """
+        Greedily build one meal from rows that closes as much of the
+        deficits ({column: amount still needed}) as possible within
+        calorie_cap.
+
+        Each round tries every remaining candidate at every PORTION_GRAMS
+        size and adds the pick closing the largest share of the remaining
+        deficits per calorie. Past the deadline (time.perf_counter value)
+        the meal found so far is returned, but never an empty one.
+
+        Returns (picks, covered) where picks is a list of (row, grams) and
+        covered maps each deficit column to the share (0-1) of its deficit
+        the meal supplies.
+        """
+        columns = [column for column, amount in deficits.items() if amount > 0]
+        if not columns or calorie_cap <= 0 or not len(rows):
+            return [], {}
+        needed = np.array([deficits[column] for column in columns], dtype=np.float64)
+
+        # Nutrients and calories per gram of every candidate
+        per_gram = np.asarray(self.values[np.ix_(rows, columns)], dtype=np.float64) / 100.0
+        energy_per_gram = self.calories[rows] / 100.0
+        billed_per_gram = np.maximum(energy_per_gram, MIN_CALORIES_PER_100G / 100.0)
+        available = np.ones(len(rows), dtype=bool)
+
+        remaining = needed.copy()
+        budget = float(calorie_cap)
+        picks = []
+
+        while len(picks) < max_foods and available.any():
+            if picks and deadline is not None and time.perf_counter() > deadline:
+                break
+            # candidates x portions x nutrients supplied
+            supplied = per_gram[:, None, :] * PORTION_GRAMS[None, :, None]
+            gain = (np.minimum(supplied, remaining) / needed).sum(axis=2)
+            cost = energy_per_gram[:, None] * PORTION_GRAMS[None, :]
+
+            fits = available[:, None] & (cost <= budget)
+            billed = billed_per_gram[:, None] * PORTION_GRAMS[None, :] + ITEM_PENALTY_CALORIES
+            score = np.where(fits, gain / billed, -1.0)
+            best = np.unravel_index(np.argmax(score), score.shape)
+            if score[best] <= 0 or gain[best] < MIN_GAIN * len(columns):
+                break
+
+            candidate, portion = best
+            grams = float(PORTION_GRAMS[portion])
+            picks.append((int(rows[candidate]), grams))
+            remaining = np.maximum(remaining - per_gram[candidate] * grams, 0.0)
+            budget -= cost[best]
+            available[candidate] = False
+            if not remaining.any():
+                break
+
+        covered = {
+            column: float(1.0 - left / need)
+            for column, left, need in zip(columns, remaining, needed)
+        }
+        return picks, covered
+
+    def optimize(self, deficits, calorie_cap, excluded=None, count=3, max_foods=5, time_budget=0.05):
+        """
+        Up to count alternative meals, each built from foods the previous
+        ones did not use, within time_budget seconds overall (the first
+        meal is always completed). excluded is an optional bool mask of
+        foods that must not be used. Returns a list of (picks, covered) as
+        from optimize_meal.
+        """
+        deadline = time.perf_counter() + time_budget
+        columns = [column for column, amount in deficits.items() if amount > 0]
+        rows = self.candidate_rows(columns, excluded, per_nutrient=CANDIDATES_PER_NUTRIENT)
+        used = np.zeros(len(self.calories), dtype=bool)
+
+        meals = []
+        for _ in range(count):
+            if meals and time.perf_counter() > deadline:
+                break
+            picks, covered = self.optimize_meal(deficits, calorie_cap, rows[~used[rows]],
+                                                max_foods=max_foods, deadline=deadline)
+            if not picks:
+                break
+            meals.append((picks, covered))
+            used[[row for row, _ in picks]] = True
+        return meals
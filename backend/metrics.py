@@ -0,0 +1,229 @@
+"""
+Request metrics and an opt-in sampling profiler for the Python backend
+Latency histograms, counters and gauges rendered in the Prometheus text format
+"""
+
+import bisect
+import collections
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram per label set"""
+
+    def __init__(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, *label_values):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += seconds
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        for label_values, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), values):
+                cumulative += count
+                labels = _labels(self.label_names + ('le',), label_values + (bound,))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _labels(self.label_names, label_values)
+            lines.append(f'{self.name}_sum{labels} {values[-1]:.6f}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class Counter:
+    """Monotonic count per label set"""
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values = collections.Counter()
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] += amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            values = dict(self._values)
+        for label_values, value in sorted(values.items()):
+            lines.append(f'{self.name}{_labels(self.label_names, label_values)} {value}')
+        return lines
+
+
+class Registry:
+    """
+    The metrics of one process. Histograms and counters are updated as
+    requests run; gauges are callables returning {name: value} (e.g. the
+    result cache's stats()), read only when the metrics are scraped.
+    """
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.requests = Histogram(
+            f'{prefix}_request_duration_seconds', 'Time spent handling HTTP requests',
+            ('method', 'route', 'status')
+        )
+        self.spans = Histogram(
+            f'{prefix}_span_duration_seconds', 'Time spent in instrumented steps of a request', ('span',)
+        )
+        self.errors = Counter(f'{prefix}_errors_total', 'Errors caught and logged by the server', ('where',))
+        self._gauges = []  # (group, collect)
+
+    def add_gauges(self, group, collect):
+        """Expose collect()'s numeric values as gauges named <prefix>_<group>_<key>"""
+        self._gauges.append((group, collect))
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = self.requests.render() + self.spans.render() + self.errors.render()
+        for group, collect in self._gauges:
+            try:
+                values = collect() or {}
+            except Exception as e:
+                print(f"Could not collect {group} metrics: {e}")
+                continue
+            for key, value in sorted(values.items()):
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = f'{self.prefix}_{group}_{key}'
+                lines.append(f'# TYPE {name} gauge')
+                lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry('nutrition')
+
+
+@contextmanager
+def span(name):
+    """Time the enclosed block into the span histogram under name"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.spans.observe(time.perf_counter() - start, name)
+
+
+def count_error(where):
+    registry.errors.inc(where)
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler for live traffic. A background thread looks at
+    the stack of every thread that is handling a request every `interval`
+    seconds and counts, per route, the function it is in and the
+    functions on its stack. Costs nothing per request beyond
+    begin()/end(), and only runs once started.
+    """
+
+    def __init__(self, interval=0.005, depth=30):
+        self.interval = interval
+        self.depth = depth
+        self._active = {}  # thread id -> route
+        self._self_counts = collections.defaultdict(collections.Counter)  # route -> frame -> samples
+        self._total_counts = collections.defaultdict(collections.Counter)
+        self._samples = collections.Counter()  # route -> samples
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if not self.running:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def begin(self, route):
+        """Mark the calling thread as handling route"""
+        self._active[threading.get_ident()] = route
+
+    def end(self):
+        self._active.pop(threading.get_ident(), None)
+
+    @staticmethod
+    def _frame_key(frame):
+        code = frame.f_code
+        return f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}:{frame.f_lineno}"
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            active = dict(self._active)
+            if not active:
+                continue
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, route in active.items():
+                    frame = frames.get(thread_id)
+                    if frame is None:
+                        continue
+                    self._samples[route] += 1
+                    self._self_counts[route][self._frame_key(frame)] += 1
+                    seen = set()
+                    for _ in range(self.depth):
+                        if frame is None:
+                            break
+                        code = frame.f_code
+                        key = f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}"
+                        if key not in seen:
+                            seen.add(key)
+                            self._total_counts[route][key] += 1
+                        frame = frame.f_back
+
+    def report(self, top=15):
+        """
+        {route: {'samples', 'self': [[file:function:line, share]],
+        'total': [[file:function, share]]}}: where sampled requests were,
+        and which functions were on their stack, as shares of the samples
+        """
+        with self._lock:
+            report = {}
+            for route, samples in self._samples.most_common():
+                report[route] = {
+                    'samples': samples,
+                    'self': [[key, round(count / samples, 4)] for key, count in self._self_counts[route].most_common(top)],
+                    'total': [[key, round(count / samples, 4)] for key, count in self._total_counts[route].most_common(top)]
+                }
+        return report
+
+    def reset(self):
+        with self._lock:
+            self._self_counts.clear()
+            self._total_counts.clear()
+            self._samples.clear()
@@ -0,0 +1,33 @@
+"""
+USDA FDC nutrient codes the app tracks
+Kept free of dependencies so SQL mode can use them without loading the JSON backend
+"""
+
+# USDA FDC Nutrient Code Mapping
+NUTRIENT_CODE_MAP = {
+    208: 'calories',
+    203: 'protein',
+    205: 'carbs',
+    204: 'fat',
+    291: 'fiber',
+    269: 'sugar',
+    301: 'calcium',
+    303: 'iron',
+    304: 'magnesium',
+    305: 'phosphorus',
+    306: 'potassium',
+    307: 'sodium',
+    309: 'zinc',
+    320: 'vitaminA',
+    401: 'vitaminC',
+    328: 'vitaminD',
+    323: 'vitaminE',
+    430: 'vitaminK',
+    415: 'vitaminB6',
+    418: 'vitaminB12',
+    417: 'folate',
+    406: 'niacin'
+}
+
+# Nutrient names in code order: the column order of every nutrient table
+NUTRIENT_NAMES = tuple(NUTRIENT_CODE_MAP.values())
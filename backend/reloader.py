@@ -0,0 +1,150 @@
+"""
+Hot reload of the JSON food database
+Rebuilds the catalog in the background and swaps it in without a restart
+"""
+
+import os
+import threading
+import time
+
+
+class CatalogReloader:
+    """
+    Loads a fresh database from json_file on a background thread and hands
+    it to `swap` once it is fully built (indexes included), so requests
+    keep being served from the current database until then.
+
+    `load(path)` builds the new database and `swap(db)` publishes it; the
+    swap is a single assignment, so a request that already fetched the old
+    database finishes on it. At most one load runs at a time: a reload
+    requested while one is running is queued and runs once the current
+    one is published, so no more than the old and the new database are
+    ever in memory together. The first load (the server's startup load)
+    runs the same way but is not counted or reported as a reload.
+
+    `watch(interval)` also reloads whenever the file's mtime or size
+    changes and then stays the same for one more interval (so a file that
+    is still being written is not read half-way). Callbacks registered with
+    `add_listener()` run after each database that is swapped in from then on.
+    """
+
+    def __init__(self, json_file, load, swap):
+        self.json_file = json_file
+        self._load = load
+        self._swap = swap
+
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pending = False
+        self._watch_pid = None
+        self._loaded = False  # the first successful load is not a reload
+        self._listeners = []
+        self._status = {
+            'state': 'idle',
+            'reloads': 0,
+            'last_reload': None,
+            'last_duration': None,
+            'last_error': None
+        }
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # Threads do not survive a fork (e.g. into gunicorn workers), and the
+        # lock may have been held by one of them at that moment
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pending = False
+        if self._status['state'] == 'loading':
+            self._status['state'] = 'idle'
+
+    def add_listener(self, callback):
+        """Call callback() on the loading thread after each successful load from now on"""
+        self._listeners.append(callback)
+
+    def request(self):
+        """Start a background reload (or queue one behind a running reload); returns status()"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                self._pending = True
+            else:
+                self._status['state'] = 'loading'
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        return self.status()
+
+    def _run(self):
+        while True:
+            start = time.monotonic()
+            try:
+                db = self._load(self.json_file)
+                self._swap(db)
+                # Keep no reference to the new database here; the swap owns it now
+                db = None
+                with self._lock:
+                    if self._loaded:
+                        self._status['reloads'] += 1
+                        self._status['last_reload'] = time.time()
+                    self._loaded = True
+                    self._status['last_error'] = None
+                self._notify()
+            except Exception as e:
+                if self._loaded:
+                    print(f"Catalog reload failed, keeping the current database: {e}")
+                else:
+                    print(f"Catalog load failed, no food database to serve: {e}")
+                with self._lock:
+                    self._status['last_error'] = str(e)
+
+            with self._lock:
+                self._status['last_duration'] = round(time.monotonic() - start, 3)
+                if not self._pending:
+                    self._status['state'] = 'idle'
+                    return
+                self._pending = False
+
+    def _notify(self):
+        for callback in self._listeners:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Catalog reload listener failed: {e}")
+
+    def _file_key(self):
+        try:
+            stat = os.stat(self.json_file)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def watch(self, interval=5.0):
+        """
+        Poll json_file every interval seconds and reload when it changes.
+        Starts one watcher thread per process (call again after a fork).
+        """
+        with self._lock:
+            if self._watch_pid == os.getpid():
+                return
+            self._watch_pid = os.getpid()
+        threading.Thread(target=self._watch, args=(interval,), daemon=True).start()
+
+    def _watch(self, interval):
+        loaded = self._file_key()
+        seen = loaded
+        while True:
+            time.sleep(interval)
+            key = self._file_key()
+            # Reload once a changed file has stopped changing
+            if key is not None and key != loaded and key == seen:
+                print(f"{self.json_file} changed, reloading the food database")
+                loaded = key
+                self.request()
+            seen = key
+
+    def status(self):
+        """Reload state and counters for /api/health"""
+        with self._lock:
+            status = dict(self._status)
+            status['queued'] = self._pending
+            status['watching'] = self._watch_pid == os.getpid()
+        return status
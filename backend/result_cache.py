@@ -0,0 +1,106 @@
+"""
+In-process LRU result cache for the Python backend
+Bounded by entry count and total bytes, with a time-to-live per entry
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache of computed responses.
+
+    Every entry carries the size the caller reports for it (e.g. the
+    length of its serialized JSON); the least recently used entries are
+    evicted once `max_entries` or `max_bytes` is exceeded, and entries
+    older than `ttl` seconds are dropped on access.
+
+    Lookups pass a namespace identifying the data the results were
+    computed from (e.g. the JSON database generation). When it changes,
+    the whole cache is cleared, so a reloaded catalog never serves stale
+    results.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=32 << 20, ttl=300.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self._entries = OrderedDict()  # key -> (value, size, stored_at), oldest first
+        self._bytes = 0
+        self._namespace = None
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expired': 0,
+            'invalidations': 0
+        }
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    def _use_namespace(self, namespace):
+        """Clear everything when the data behind the cache has changed"""
+        if namespace != self._namespace:
+            if self._entries:
+                self._stats['invalidations'] += 1
+            self._entries.clear()
+            self._bytes = 0
+            self._namespace = namespace
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, key, namespace=None):
+        """Return the cached value for key, or None on a miss"""
+        with self._lock:
+            self._use_namespace(namespace)
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            if time.monotonic() - entry[2] > self.ttl:
+                self._remove(key)
+                self._stats['expired'] += 1
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return entry[0]
+
+    def put(self, key, value, size, namespace=None):
+        """Store value (of size bytes), evicting least recently used entries as needed"""
+        if not self.enabled or size > self.max_bytes:
+            return
+        with self._lock:
+            self._use_namespace(namespace)
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, time.monotonic())
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._stats['evictions'] += 1
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Cache counters for /api/health"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._bytes
+        stats['max_entries'] = self.max_entries
+        stats['max_bytes'] = self.max_bytes
+        stats['ttl'] = self.ttl
+        return stats
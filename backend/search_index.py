@@ -0,0 +1,331 @@
+"""
+Inverted search index for the JSON food database
+Maps description tokens to sorted posting lists of food positions,
+and ranks matches with BM25 plus typo-tolerant token lookup
+"""
+
+import math
+from bisect import bisect_left
+from collections import Counter
+
+import numpy as np
+
+from text_tokens import tokenize
+
+# Sorts after every token character, so [prefix, prefix + PREFIX_END) spans all tokens with that prefix
+PREFIX_END = '\x7f'
+
+# BM25 parameters. Descriptions hold each token once, so k1 only shapes
+# how strongly short descriptions ("Egg, whole, raw") beat long ones.
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Relative weight of a query term matching a description token...
+EXACT_WEIGHT = 1.0      # exactly ("egg" -> egg)
+PREFIX_WEIGHT = 0.8     # as a prefix ("egg" -> eggplant)
+FUZZY_WEIGHTS = {1: 0.6, 2: 0.4}  # within this edit distance of a prefix ("brocoli" -> broccoli)
+
+# Query terms shorter than this are never typo-corrected
+FUZZY_MIN_LENGTH = 4
+
+# Autocomplete: most suggestions returned, and the longest single-word
+# prefix whose suggestions are kept once computed (the broad, slow ones)
+SUGGEST_LIMIT = 10
+SUGGEST_MEMO_LENGTH = 3
+
+
+def max_typos(term):
+    """Edit distance tolerated when correcting term"""
+    if len(term) < FUZZY_MIN_LENGTH:
+        return 0
+    return 1 if len(term) < 8 else 2
+
+
+def _trigrams(token):
+    padded = f'  {token} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, limit, prefix=False):
+    """
+    Optimal string alignment distance between a and b (insertions,
+    deletions, substitutions and adjacent swaps), or limit + 1 as soon
+    as it is known to exceed limit. With prefix=True, the distance from a
+    to the closest prefix of b.
+    """
+    if len(a) - len(b) > limit or (not prefix and len(b) - len(a) > limit):
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return min(previous) if prefix else previous[-1]
+
+
+class SearchIndex:
+    """
+    Token -> posting list index with prefix lookup over food descriptions,
+    and BM25-ranked, typo-tolerant search on top of it.
+
+    Postings are stored CSR-style: the positions for tokens[i] are
+    positions[offsets[i]:offsets[i + 1]], so the postings of every token
+    sharing a prefix form one contiguous slice, and the arrays can be
+    saved to and memory-mapped from a snapshot.
+    """
+
+    def __init__(self, tokens, offsets, positions):
+        """Wrap prebuilt index arrays (see build)"""
+        self.tokens = tokens
+        self.offsets = offsets
+        self.positions = positions
+        # Derived on first use, so opening a snapshot stays cheap
+        self._doc_lengths = None
+        self._trigram_index = None
+        self._suggestions = {}
+
+    @classmethod
+    def build(cls, descriptions):
+        """Build the index from an iterable of descriptions (position = food index)"""
+        postings = {}
+        for position, description in enumerate(descriptions):
+            for token in set(tokenize(description)):
+                postings.setdefault(token, []).append(position)
+
+        # Positions are appended in increasing order, so each list is sorted
+        tokens = sorted(postings)
+        offsets = np.zeros(len(tokens) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(postings[token]) for token in tokens])
+        positions = np.fromiter(
+            (position for token in tokens for position in postings[token]),
+            dtype=np.int32, count=int(offsets[-1])
+        )
+        return cls(tokens, offsets, positions)
+
+    def prefix_postings(self, prefix, exclude=()):
+        """
+        Return the sorted positions of foods with a token starting with
+        prefix, ignoring tokens that start with any of the longer prefixes
+        in exclude (e.g. prefix 'egg', exclude ('eggplant',))
+        """
+        start, end = self._token_range(prefix)
+        # Token ranges to read, minus the excluded sub-ranges
+        ranges = [(start, end)]
+        for excluded in exclude:
+            cut_start, cut_end = self._token_range(excluded)
+            ranges = [
+                piece
+                for range_start, range_end in ranges
+                for piece in ((range_start, min(range_end, cut_start)), (max(range_start, cut_end), range_end))
+                if piece[0] < piece[1]
+            ]
+        if not ranges:
+            return self.positions[:0]
+        if len(ranges) == 1:
+            start, end = ranges[0]
+            matched = self.positions[self.offsets[start]:self.offsets[end]]
+            return self._union(matched) if end - start > 1 else matched
+        return self._union(np.concatenate([
+            self.positions[self.offsets[range_start]:self.offsets[range_end]] for range_start, range_end in ranges
+        ]))
+
+    def _union(self, positions):
+        """Sorted distinct positions; a bitmap beats sorting for broad prefixes"""
+        doc_count = len(self.doc_lengths)
+        if len(positions) * 8 < doc_count:
+            return np.unique(positions)
+        seen = np.zeros(doc_count, dtype=bool)
+        seen[positions] = True
+        return np.flatnonzero(seen)
+
+    def _token_range(self, prefix):
+        """Indexes [start, end) of the tokens starting with prefix"""
+        start = bisect_left(self.tokens, prefix)
+        return start, bisect_left(self.tokens, prefix + PREFIX_END, start)
+
+    def _has_prefix(self, prefix):
+        start, end = self._token_range(prefix)
+        return end > start
+
+    def _postings(self, token_id):
+        return self.positions[self.offsets[token_id]:self.offsets[token_id + 1]]
+
+    @property
+    def doc_lengths(self):
+        """Distinct-token count of every description, by position"""
+        if self._doc_lengths is None:
+            self._doc_lengths = np.bincount(self.positions)
+        return self._doc_lengths
+
+    @property
+    def trigram_index(self):
+        """Trigram -> ids of the vocabulary tokens containing it"""
+        if self._trigram_index is None:
+            trigram_index = {}
+            for token_id, token in enumerate(self.tokens):
+                for trigram in _trigrams(token):
+                    trigram_index.setdefault(trigram, []).append(token_id)
+            self._trigram_index = trigram_index
+        return self._trigram_index
+
+    def typo_tokens(self, term):
+        """
+        Return {token_id: distance} for indexed tokens that start with a
+        string within max_typos(term) edits of term. Candidates share trigrams with term; the trigram table
+        over the vocabulary is built on the first typo lookup.
+        """
+        limit = max_typos(term)
+        if not limit:
+            return {}
+        trigram_index = self.trigram_index
+        term_trigrams = _trigrams(term)
+        shared = Counter()
+        for trigram in term_trigrams:
+            shared.update(trigram_index.get(trigram, ()))
+
+        # An edit (or adjacent swap) breaks at most 4 of term's trigrams
+        min_shared = max(1, len(term_trigrams) - 4 * limit)
+        matches = {}
+        for token_id, count in shared.items():
+            if count < min_shared:
+                continue
+            distance = edit_distance(term, self.tokens[token_id], limit, prefix=True)
+            if 0 < distance <= limit:
+                matches[token_id] = distance
+        return matches
+
+    def _term_weights(self, term, fuzzy):
+        """
+        Return (positions, weights) of the foods matching one query term,
+        each weighted by its best match: exact token, prefix, then typo.
+        """
+        start, end = self._token_range(term)
+        groups = []  # (positions, weight), in increasing weight
+        if fuzzy:
+            by_distance = {}
+            for token_id, distance in self.typo_tokens(term).items():
+                if not start <= token_id < end:
+                    by_distance.setdefault(distance, []).append(self._postings(token_id))
+            for distance in sorted(by_distance, reverse=True):
+                groups.append((self._union(np.concatenate(by_distance[distance])), FUZZY_WEIGHTS[distance]))
+        if end > start:
+            groups.append((self.prefix_postings(term), PREFIX_WEIGHT))
+            if self.tokens[start] == term:
+                groups.append((self._postings(start), EXACT_WEIGHT))
+
+        if not groups:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        positions = groups[0][0] if len(groups) == 1 else self._union(np.concatenate([g[0] for g in groups]))
+        weights = np.empty(len(positions))
+        # Later (stronger) groups overwrite earlier ones
+        for group_positions, weight in groups:
+            weights[np.searchsorted(positions, group_positions)] = weight
+        return positions, weights
+
+    def _match(self, terms, fuzzy_terms):
+        """Positions matching every term and their summed BM25 scores"""
+        doc_lengths = self.doc_lengths
+        doc_count = len(doc_lengths)
+        avg_length = self.offsets[-1] / max(np.count_nonzero(doc_lengths), 1)
+
+        matched = scores = None
+        for term in terms:
+            positions, weights = self._term_weights(term, term in fuzzy_terms)
+            if not positions.size:
+                return positions, weights
+            idf = math.log(1 + (doc_count - len(positions) + 0.5) / (len(positions) + 0.5))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_lengths[positions] / avg_length)
+            term_scores = weights * idf * (BM25_K1 + 1) / (1 + norm)
+            if matched is None:
+                matched, scores = positions, term_scores
+            else:
+                matched, left, right = np.intersect1d(matched, positions, assume_unique=True, return_indices=True)
+                scores = scores[left] + term_scores[right]
+                if not matched.size:
+                    break
+        return matched, scores
+
+    def candidates(self, query_words):
+        """
+        Return the food positions (ascending array) whose description has
+        a token prefixed by every alphanumeric piece of every query word.
+        Returns None when the query has nothing indexable.
+        """
+        prefixes = set()
+        for word in query_words:
+            prefixes.update(tokenize(word))
+        if not prefixes:
+            return None
+
+        lists = sorted((self.prefix_postings(p) for p in prefixes), key=len)
+        matched = lists[0]
+        for other in lists[1:]:
+            if not matched.size:
+                break
+            matched = np.intersect1d(matched, other, assume_unique=True)
+        return matched
+
+    def search(self, query, limit=20):
+        """
+        Return up to limit food positions matching every query term, best
+        BM25 score first (ties in file order). A term matches a description
+        token it prefixes, or failing that a token within a couple of typos.
+        Returns None when the query has nothing indexable.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return None
+
+        # Correct only terms that match nothing as typed...
+        fuzzy_terms = {term for term in terms if not self._has_prefix(term)}
+        matched, scores = self._match(terms, fuzzy_terms)
+        # ...unless together they match nothing, then every term long enough
+        if not matched.size:
+            retry = {term for term in terms if max_typos(term)}
+            if retry - fuzzy_terms:
+                matched, scores = self._match(terms, retry)
+
+        # Partial selection instead of sorting every match
+        if len(matched) > limit > 0:
+            threshold = np.partition(scores, len(scores) - limit)[len(scores) - limit]
+            keep = scores >= threshold
+            matched, scores = matched[keep], scores[keep]
+        order = np.argsort(-scores, kind='stable')[:max(limit, 0)]
+        return matched[order].tolist()
+
+    def suggest(self, prefix, limit=SUGGEST_LIMIT):
+        """
+        Return up to limit (at most SUGGEST_LIMIT) food positions for
+        autocomplete, ranked like search. Top suggestions for single-word
+        prefixes up to SUGGEST_MEMO_LENGTH characters are computed once and
+        then served from a table; longer prefixes are narrow enough to
+        search directly.
+        """
+        terms = tokenize(prefix)
+        if not terms:
+            return []
+        limit = min(limit, SUGGEST_LIMIT)
+        if len(terms) == 1 and len(terms[0]) <= SUGGEST_MEMO_LENGTH:
+            top = self._suggestions.get(terms[0])
+            if top is None:
+                top = self._suggestions[terms[0]] = self.search(terms[0], SUGGEST_LIMIT)
+            return top[:limit]
+        return self.search(prefix, limit)
+
+    def warm(self, length=2):
+        """
+        Build everything search derives lazily (document lengths, the typo
+        trigram table) and the suggestions for every indexed prefix up to
+        length characters
+        """
+        self.doc_lengths
+        self.trigram_index
+        for prefix in sorted({token[:n] for token in self.tokens for n in range(1, length + 1)}):
+            self.suggest(prefix)
@@ -4,13 +4,22 @@ Python Backend for ATE Nutrition Tracking App
 Equivalent to server.js - supports both MySQL and JSON database modes
 """
 
-from flask import Flask, jsonify, request
+from flask import Flask, g, jsonify, request
 from flask_cors import CORS
+import asyncio
+import hmac
+import math
 import os
 import json
-import mysql.connector
-from mysql.connector import Error
+import threading
+import time
 from dotenv import load_dotenv
+from db_pool import ConnectionPool, mysql_config_from_env, mysql_connector
+from reloader import CatalogReloader
+from result_cache import ResultCache
+import allergens
+import food_summary
+import metrics
 
 # Load environment variables
 load_dotenv()
@@ -21,39 +30,191 @@ CORS(app)
 # Configuration
 PORT = int(os.getenv('PORT', 5001))  # Use 5001 to avoid conflict with Node.js server
 USE_JSON_DB = os.getenv('USE_JSON_DB', 'true').lower() in ('1', 'true', 'yes')
+MAX_BATCH_IDS = 500  # Upper bound on ids accepted by /api/foods/batch
+MAX_SUGGESTIONS = 10  # Upper bound on /api/foods/suggest results
+MAX_TOTALS_ITEMS = 1000  # Upper bound on items accepted by /api/nutrients/totals
+MAX_SIMILAR = 50  # Upper bound on /api/foods/<id>/similar results
+MAX_PAGE_SIZE = 1000  # Upper bound on ?limit for a page of /api/foods
+EXPORT_BATCH_SIZE = 1000  # Foods fetched per step while streaming /api/foods?format=ndjson
+MEAL_OPTIMIZER_BUDGET = 0.05  # Seconds /api/meals/optimize may spend searching
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')  # Enables POST /api/admin/reload when set
+JSON_DB_WATCH_INTERVAL = float(os.getenv('JSON_DB_WATCH_INTERVAL', 0))  # Seconds between file checks; 0 disables
+PROFILE_SAMPLE_INTERVAL = float(os.getenv('PROFILE_SAMPLE_INTERVAL', 0))  # Seconds between profiler samples; 0 disables
+CATALOG_WAIT_TIMEOUT = float(os.getenv('CATALOG_WAIT_TIMEOUT', 10))  # Seconds a request waits for the catalog to load
+
+# Keys of a food, as selected by /api/foods?fields=
+FOOD_FIELDS = ('id', 'name', 'unit', 'servingOptions') + food_summary.NUTRIENT_NAMES
 
 # MySQL Configuration
-MYSQL_CONFIG = {
-    'host': os.getenv('DB_HOST', 'localhost'),
-    'user': os.getenv('DB_USER', 'root'),
-    'password': os.getenv('DB_PASSWORD', ''),
-    'database': os.getenv('DB_NAME', 'nutrition_db')
-}
+MYSQL_CONFIG = mysql_config_from_env()
+
+# How often to re-check for the food_summary table while it is missing
+FOOD_SUMMARY_RECHECK = 60
+
+# Shared MySQL connection pool (connections are opened on first use)
+db_pool = ConnectionPool(
+    MYSQL_CONFIG,
+    size=int(os.getenv('DB_POOL_SIZE', 5)),
+    timeout=float(os.getenv('DB_POOL_TIMEOUT', 5)),
+    ping_interval=float(os.getenv('DB_POOL_PING_INTERVAL', 30)),
+    recycle=float(os.getenv('DB_POOL_RECYCLE', 3600))
+)
+
+# Cache of search and lookup responses, cleared whenever the catalog reloads
+result_cache = ResultCache(
+    max_entries=int(os.getenv('RESULT_CACHE_SIZE', 1024)),
+    max_bytes=int(os.getenv('RESULT_CACHE_MAX_BYTES', 32 << 20)),
+    ttl=float(os.getenv('RESULT_CACHE_TTL', 300))
+)
+# Cache the serialized response body, so hits skip jsonify entirely
+RESULT_CACHE_SERIALIZED = os.getenv('RESULT_CACHE_SERIALIZED', 'true').lower() in ('1', 'true', 'yes')
 
-# JSON Database
+# JSON Database, loaded in the background once create_app() (or the first request) starts it
 json_db = None
+catalog_reloader = None
+catalog_ready = threading.Event()
+catalog_state = {'phase': 'idle', 'progress': None, 'started_at': None, 'ready_at': None}
+_catalog_lock = threading.Lock()
+json_file = os.path.join(os.path.dirname(__file__), 'usda_foods.json')
+# Set in gunicorn workers (see gunicorn.conf.py), which leave reloading to the
+# master: the signal that asks it to reload
+reload_signal = None
 if USE_JSON_DB:
     try:
-        from json_db import JsonDatabase
-        json_file = os.path.join(os.path.dirname(__file__), 'usda_foods.json')
-        if os.path.exists(json_file):
-            json_db = JsonDatabase(json_file)
-            print(f"✓ JSON database loaded from {json_file}")
-        else:
-            print(f"⚠ JSON file not found: {json_file}")
-    except ImportError:
-        print("⚠ json_db.py not found, falling back to SQL mode")
+        from json_db import JsonDatabase, NUTRIENT_COLUMNS, FILTER_OPS
+        from meal_optimizer import MealOptimizer
+    except ImportError as e:
+        print(f"⚠ JSON database unavailable ({e}), falling back to SQL mode")
         USE_JSON_DB = False
 
+class CatalogNotReady(Exception):
+    """The JSON database is still loading after CATALOG_WAIT_TIMEOUT seconds"""
+
+def report_catalog_progress(phase, progress=None):
+    """Progress callback for the first load, shown in /api/health"""
+    if not catalog_ready.is_set():
+        catalog_state['phase'] = phase
+        catalog_state['progress'] = round(progress, 3) if progress is not None else None
+
+def load_json_db(path):
+    """Build a JsonDatabase, search tables included, for the first load or a reload"""
+    try:
+        db = JsonDatabase(path, progress=report_catalog_progress)
+        if not db.foods and json_db is not None:
+            # JsonDatabase logs and loads nothing on a missing or broken file
+            raise ValueError(f"no foods loaded from {path}")
+        report_catalog_progress('warming')
+        db.warm()
+        return db
+    except Exception:
+        if not catalog_ready.is_set():
+            # Nothing to keep serving: stop making requests wait for it
+            catalog_state['phase'] = 'failed'
+            catalog_ready.set()
+        raise
+
+def swap_json_db(db):
+    """
+    Publish a loaded database. Requests read the json_db global once and
+    keep using what they read, so requests already running finish on the
+    old database, which is freed after the last of them.
+    """
+    global json_db
+    first = json_db is None
+    json_db = db
+    # Drop the optimizer built over the old database's arrays
+    with _meal_optimizer_lock:
+        _meal_optimizer['generation'] = None
+        _meal_optimizer['optimizer'] = None
+    if not catalog_ready.is_set():
+        catalog_state.update(phase='ready', progress=1.0, ready_at=time.time())
+        catalog_ready.set()
+    if first:
+        print(f"✓ JSON database loaded from {json_file}: {len(db.foods)} foods")
+    else:
+        print(f"✓ JSON database reloaded: {len(db.foods)} foods")
+
+def start_catalog_load():
+    """Start loading usda_foods.json on a background thread (once)"""
+    with _catalog_lock:
+        if not USE_JSON_DB:
+            # SQL mode has no catalog to wait for
+            catalog_ready.set()
+            return
+        if catalog_state['phase'] != 'idle':
+            return
+        catalog_state['started_at'] = time.time()
+        if not os.path.exists(json_file):
+            print(f"⚠ JSON file not found: {json_file}")
+            catalog_state['phase'] = 'missing'
+            catalog_ready.set()
+            return
+        catalog_state['phase'] = 'starting'
+    catalog_reloader.request()
+
+def _after_fork_in_child():
+    # A load still running is not copied into a forked child (e.g. a
+    # gunicorn worker forked before it finished): let the child start its own
+    global _catalog_lock
+    _catalog_lock = threading.Lock()
+    if not catalog_ready.is_set():
+        catalog_state['phase'] = 'idle'
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+def wait_for_catalog(timeout=None):
+    """Block until the first catalog load has finished (or failed); False on timeout"""
+    return catalog_ready.wait(timeout)
+
+def catalog_status():
+    """Load phase and progress of the JSON database for /api/health"""
+    status = dict(catalog_state)
+    status['ready'] = catalog_ready.is_set()
+    if status['started_at'] is not None:
+        status['seconds'] = round((status['ready_at'] or time.time()) - status['started_at'], 3)
+    return status
+
+if USE_JSON_DB:
+    catalog_reloader = CatalogReloader(json_file, load_json_db, swap_json_db)
+
+# Nutrient pivot shared by the SQL queries
+SQL_FOOD_SELECT = """
+    SELECT DISTINCT
+        f.fdc_id as id,
+        f.description as name,
+        '100 g' as unit,
+        MAX(CASE WHEN n.nutrient_id = 208 THEN fn.amount END) as calories,
+        MAX(CASE WHEN n.nutrient_id = 203 THEN fn.amount END) as protein,
+        MAX(CASE WHEN n.nutrient_id = 205 THEN fn.amount END) as carbs,
+        MAX(CASE WHEN n.nutrient_id = 204 THEN fn.amount END) as fat,
+        MAX(CASE WHEN n.nutrient_id = 291 THEN fn.amount END) as fiber,
+        MAX(CASE WHEN n.nutrient_id = 269 THEN fn.amount END) as sugar,
+        MAX(CASE WHEN n.nutrient_id = 301 THEN fn.amount END) as calcium,
+        MAX(CASE WHEN n.nutrient_id = 303 THEN fn.amount END) as iron,
+        MAX(CASE WHEN n.nutrient_id = 304 THEN fn.amount END) as magnesium,
+        MAX(CASE WHEN n.nutrient_id = 305 THEN fn.amount END) as phosphorus,
+        MAX(CASE WHEN n.nutrient_id = 306 THEN fn.amount END) as potassium,
+        MAX(CASE WHEN n.nutrient_id = 307 THEN fn.amount END) as sodium,
+        MAX(CASE WHEN n.nutrient_id = 309 THEN fn.amount END) as zinc,
+        MAX(CASE WHEN n.nutrient_id = 320 THEN fn.amount END) as vitaminA,
+        MAX(CASE WHEN n.nutrient_id = 401 THEN fn.amount END) as vitaminC,
+        MAX(CASE WHEN n.nutrient_id = 328 THEN fn.amount END) as vitaminD,
+        MAX(CASE WHEN n.nutrient_id = 323 THEN fn.amount END) as vitaminE,
+        MAX(CASE WHEN n.nutrient_id = 430 THEN fn.amount END) as vitaminK,
+        MAX(CASE WHEN n.nutrient_id = 415 THEN fn.amount END) as vitaminB6,
+        MAX(CASE WHEN n.nutrient_id = 418 THEN fn.amount END) as vitaminB12,
+        MAX(CASE WHEN n.nutrient_id = 417 THEN fn.amount END) as folate,
+        MAX(CASE WHEN n.nutrient_id = 406 THEN fn.amount END) as niacin
+    FROM food f
+    JOIN food_nutrient fn ON f.fdc_id = fn.fdc_id
+    JOIN nutrient n ON fn.nutrient_id = n.id
+"""
+
 # Helper Functions
 def get_db_connection():
-    """Create MySQL database connection"""
-    try:
-        connection = mysql.connector.connect(**MYSQL_CONFIG)
-        return connection
-    except Error as e:
-        print(f"Error connecting to MySQL: {e}")
-        return None
+    """Borrow a MySQL connection from the pool; close() returns it"""
+    return db_pool.get_connection()
 
 def safe_float(value, default=0.0):
     """Safely convert value to float"""
@@ -62,50 +223,19 @@ def safe_float(value, default=0.0):
     except (ValueError, TypeError):
         return default
 
-def search_foods_sql(query):
-    """Search foods using MySQL database"""
-    connection = get_db_connection()
+def run_food_query_sql(sql_query, params=()):
+    """Run a food query on a pooled connection; missing nutrients become 0.0"""
+    with metrics.span('sql.connection'):
+        connection = get_db_connection()
     if not connection:
         return []
     
+    cursor = None
     try:
         cursor = connection.cursor(dictionary=True)
-        sql_query = """
-            SELECT DISTINCT
-                f.fdc_id as id,
-                f.description as name,
-                '100 g' as unit,
-                MAX(CASE WHEN n.nutrient_id = 208 THEN fn.amount END) as calories,
-                MAX(CASE WHEN n.nutrient_id = 203 THEN fn.amount END) as protein,
-                MAX(CASE WHEN n.nutrient_id = 205 THEN fn.amount END) as carbs,
-                MAX(CASE WHEN n.nutrient_id = 204 THEN fn.amount END) as fat,
-                MAX(CASE WHEN n.nutrient_id = 291 THEN fn.amount END) as fiber,
-                MAX(CASE WHEN n.nutrient_id = 269 THEN fn.amount END) as sugar,
-                MAX(CASE WHEN n.nutrient_id = 301 THEN fn.amount END) as calcium,
-                MAX(CASE WHEN n.nutrient_id = 303 THEN fn.amount END) as iron,
-                MAX(CASE WHEN n.nutrient_id = 304 THEN fn.amount END) as magnesium,
-                MAX(CASE WHEN n.nutrient_id = 305 THEN fn.amount END) as phosphorus,
-                MAX(CASE WHEN n.nutrient_id = 306 THEN fn.amount END) as potassium,
-                MAX(CASE WHEN n.nutrient_id = 307 THEN fn.amount END) as sodium,
-                MAX(CASE WHEN n.nutrient_id = 309 THEN fn.amount END) as zinc,
-                MAX(CASE WHEN n.nutrient_id = 320 THEN fn.amount END) as vitaminA,
-                MAX(CASE WHEN n.nutrient_id = 401 THEN fn.amount END) as vitaminC,
-                MAX(CASE WHEN n.nutrient_id = 328 THEN fn.amount END) as vitaminD,
-                MAX(CASE WHEN n.nutrient_id = 323 THEN fn.amount END) as vitaminE,
-                MAX(CASE WHEN n.nutrient_id = 430 THEN fn.amount END) as vitaminK,
-                MAX(CASE WHEN n.nutrient_id = 415 THEN fn.amount END) as vitaminB6,
-                MAX(CASE WHEN n.nutrient_id = 418 THEN fn.amount END) as vitaminB12,
-                MAX(CASE WHEN n.nutrient_id = 417 THEN fn.amount END) as folate,
-                MAX(CASE WHEN n.nutrient_id = 406 THEN fn.amount END) as niacin
-            FROM food f
-            JOIN food_nutrient fn ON f.fdc_id = fn.fdc_id
-            JOIN nutrient n ON fn.nutrient_id = n.id
-            WHERE f.description LIKE %s
-            GROUP BY f.fdc_id, f.description
-            LIMIT 20
-        """
-        cursor.execute(sql_query, (f'%{query}%',))
-        results = cursor.fetchall()
+        with metrics.span('sql.query'):
+            cursor.execute(sql_query, params)
+            results = cursor.fetchall()
         
         # Convert None to 0 for all numeric fields
         for row in results:
@@ -114,19 +244,159 @@ def search_foods_sql(query):
                     row[key] = 0.0
         
         return results
-    except Error as e:
+    except mysql_connector().Error as e:
         print(f"SQL Error: {e}")
+        metrics.count_error('sql')
         return []
     finally:
-        if connection.is_connected():
+        # Always hand the connection back, even if it dropped mid-query
+        if cursor is not None and connection.is_connected():
             cursor.close()
-            connection.close()
+        connection.close()
+
+def query_foods_sql(where_clause='', params=(), limit=20):
+    """Run the per-request nutrient pivot with an optional WHERE clause"""
+    sql_query = f"""
+        {SQL_FOOD_SELECT}
+        {where_clause}
+        GROUP BY f.fdc_id, f.description
+        LIMIT {int(limit)}
+    """
+    return run_food_query_sql(sql_query, params)
+
+_food_summary_state = {'available': False, 'checked_at': None}
+
+def food_summary_available():
+    """
+    True when the pre-pivoted food_summary table exists (see food_summary.py).
+    A positive answer is kept; a negative one is re-checked every
+    FOOD_SUMMARY_RECHECK seconds so a freshly built table is picked up.
+    """
+    state = _food_summary_state
+    if state['available']:
+        return True
+    now = time.time()
+    if state['checked_at'] is not None and now - state['checked_at'] < FOOD_SUMMARY_RECHECK:
+        return False
+    state['checked_at'] = now
+    
+    connection = get_db_connection()
+    if not connection:
+        return False
+    try:
+        cursor = connection.cursor()
+        state['available'] = food_summary.table_exists(cursor)
+        cursor.close()
+    except mysql_connector().Error as e:
+        print(f"SQL Error: {e}")
+    finally:
+        connection.close()
+    return state['available']
+
+def search_foods_sql(query):
+    """Search foods using MySQL database"""
+    with metrics.span('sql.search'):
+        if food_summary_available():
+            return run_food_query_sql(*food_summary.search_sql(query, limit=20))
+        return query_foods_sql('WHERE f.description LIKE %s', (f'%{query}%',), limit=20)
+
+def get_foods_by_ids_sql(food_ids):
+    """Fetch foods by fdc_id using MySQL database"""
+    if not food_ids:
+        return []
+    if food_summary_available():
+        return run_food_query_sql(*food_summary.by_ids_sql(food_ids))
+    placeholders = ', '.join(['%s'] * len(food_ids))
+    return query_foods_sql(f'WHERE f.fdc_id IN ({placeholders})', tuple(food_ids), limit=len(food_ids))
+
+def page_foods_sql(after=None, limit=50, fields=None):
+    """Keyset page of foods by fdc_id using MySQL database: (foods, next cursor), as JsonDatabase.page"""
+    if food_summary_available():
+        rows = run_food_query_sql(*food_summary.page_sql(after, limit + 1, fields))
+        ids = [row['id'] for row in rows]
+    else:
+        # Pick the page's ids first, so the nutrient pivot only runs over them
+        where, params = ('WHERE fdc_id > %s', (after,)) if after is not None else ('', ())
+        ids = [row['id'] for row in run_food_query_sql(
+            f"SELECT fdc_id AS id FROM food {where} ORDER BY fdc_id LIMIT {int(limit) + 1}", params
+        )]
+        by_id = {row['id']: row for row in get_foods_by_ids_sql(ids[:limit])}
+        rows = [by_id[food_id] for food_id in ids[:limit] if food_id in by_id]
+    
+    # The extra row fetched tells whether another page follows
+    next_cursor = ids[limit - 1] if len(ids) > limit else None
+    rows = rows[:limit]
+    if fields is not None:
+        rows = [{field: row[field] for field in fields if field in row} for row in rows]
+    return rows, next_cursor
+
+def suggest_foods_sql(prefix, limit=MAX_SUGGESTIONS):
+    """Autocomplete (id and name only) using MySQL database"""
+    if food_summary_available():
+        return run_food_query_sql(*food_summary.suggest_sql(prefix, limit))
+    # A leading-anchored LIKE on food alone; no nutrient pivot needed for names
+    return run_food_query_sql(
+        f"SELECT fdc_id AS id, description AS name FROM food WHERE description LIKE %s LIMIT {int(limit)}",
+        (f'{prefix}%',)
+    )
+
+def active_json_db():
+    """
+    The JSON database to serve from, or None in SQL mode (or when the file
+    is missing). A reload swaps the global, so a request reads it once and
+    sticks to what it got. While the catalog is still loading, waits up to
+    CATALOG_WAIT_TIMEOUT seconds, then raises CatalogNotReady.
+    """
+    if not USE_JSON_DB:
+        return None
+    if not catalog_ready.is_set():
+        # Served as server:app, without create_app(): load on first use
+        start_catalog_load()
+        if not wait_for_catalog(CATALOG_WAIT_TIMEOUT):
+            raise CatalogNotReady()
+    return json_db
 
-def search_foods_json(query):
+def search_foods_json(query, db):
     """Search foods using JSON database"""
-    if not json_db:
+    if not db:
         return []
-    return json_db.search(query)
+    return db.search(query)
+
+def data_version(db):
+    """Identity of the data responses are computed from (changes on reload)"""
+    if db:
+        return ('json', db.generation)
+    return ('sql',)
+
+def cached_json(key, compute):
+    """
+    Respond with compute(db)'s result as JSON, reusing a cached response
+    for key while the data is unchanged; db is the active JSON database
+    (None in SQL mode). Returns None when compute() finds nothing; empty
+    results are not cached (in SQL mode they may just mean the database
+    was unreachable).
+    """
+    db = active_json_db()
+    namespace = data_version(db)
+    cached = result_cache.get(key, namespace)
+    if cached is not None:
+        if RESULT_CACHE_SERIALIZED:
+            return app.response_class(cached, mimetype=app.json.mimetype)
+        return jsonify(cached)
+    
+    results = compute(db)
+    if results is None:
+        return None
+    with metrics.span('jsonify'):
+        response = jsonify(results)
+    if results:
+        body = response.get_data()
+        result_cache.put(key, body if RESULT_CACHE_SERIALIZED else results, len(body), namespace)
+    return response
+
+def normalize_query(query):
+    """Cache key form of a search query"""
+    return ' '.join(query.lower().split())
 
 # Meal Templates for Suggestions
 MEAL_TEMPLATES = [
@@ -220,89 +490,582 @@ MEAL_TEMPLATES = [
     }
 ]
 
+# Lowercased nutrient names each template is good for
+TEMPLATE_NUTRIENTS = {
+    template['id']: frozenset(n.lower() for n in template.get('nutrients', []))
+    for template in MEAL_TEMPLATES
+}
+
+# Lowercased text of each template (name, category, ingredient queries),
+# matched against allergy keywords that are not a known allergen
+TEMPLATE_TEXT = {
+    template['id']: json.dumps(template).lower()
+    for template in MEAL_TEMPLATES
+}
+
+# Nutrients totalled for suggested meals
+MEAL_NUTRIENT_KEYS = (
+    'calories', 'protein', 'carbs', 'fat', 'fiber', 'sugar', 'calcium', 'iron',
+    'magnesium', 'phosphorus', 'potassium', 'sodium', 'zinc', 'vitaminA',
+    'vitaminC', 'vitaminD', 'vitaminE', 'vitaminK', 'vitaminB6', 'vitaminB12',
+    'folate', 'niacin'
+)
+
+# SQL mode has no reload signal, so resolved templates expire after this many seconds
+TEMPLATE_CACHE_TTL = int(os.getenv('TEMPLATE_CACHE_TTL', 300))
+
+# Template ingredient searches run at once while resolving templates
+TEMPLATE_LOOKUP_CONCURRENCY = int(os.getenv('TEMPLATE_LOOKUP_CONCURRENCY', db_pool.size))
+
+# Template id -> (foods, total_nutrients), valid for one database load
+_template_cache = {'key': None, 'meals': {}}
+_template_cache_lock = threading.Lock()
+
+def search_template_food(query, db):
+    """Search one meal template ingredient in db (SQL when None)"""
+    if db:
+        return search_foods_json(query, db)
+    return search_foods_sql(query)
+
+async def search_template_foods(queries, db):
+    """
+    Look up template ingredients concurrently, each on a worker thread,
+    with at most TEMPLATE_LOOKUP_CONCURRENCY in flight (by default one per
+    pooled MySQL connection). Returns {query: search results}.
+    """
+    limiter = asyncio.Semaphore(TEMPLATE_LOOKUP_CONCURRENCY)
+    
+    async def lookup(query):
+        async with limiter:
+            return await asyncio.to_thread(search_template_food, query, db)
+    
+    results = await asyncio.gather(*(lookup(query) for query in queries))
+    return dict(zip(queries, results))
+
+def resolve_template(template, search_results_by_query):
+    """Total the nutrients of a meal template's best-matching foods"""
+    foods = []
+    total_nutrients = dict.fromkeys(MEAL_NUTRIENT_KEYS, 0)
+    
+    for food_template in template['foods']:
+        search_results = search_results_by_query[food_template['query']]
+        
+        if search_results:
+            food = search_results[0]
+            multiplier = food_template['multiplier']
+            
+            # Add to foods list
+            foods.append({
+                'id': food['id'],
+                'name': food['name'],
+                'amount': multiplier,
+                'unit': food_template['unit'],
+                'nutrients': {
+                    key: safe_float(food.get(key, 0)) * multiplier
+                    for key in MEAL_NUTRIENT_KEYS
+                }
+            })
+            
+            # Aggregate nutrients
+            for key in MEAL_NUTRIENT_KEYS:
+                total_nutrients[key] += safe_float(food.get(key, 0)) * multiplier
+    
+    return foods, total_nutrients
+
+def template_allergens(template, foods):
+    """
+    (bits, text) for allergy checks on a resolved template: the allergen
+    groups of its ingredient queries and of the foods they resolved to,
+    and its text with those food names appended
+    """
+    names = ' '.join(food['name'] for food in foods).lower()
+    text = f"{TEMPLATE_TEXT[template['id']]} {names}"
+    return allergens.text_bits(text), text
+
+def get_resolved_templates():
+    """
+    Resolve every meal template once and reuse the result until the
+    JSON database reloads (or the SQL TTL passes). Callers must treat the
+    returned (foods, totals, allergen bits, allergen text) as read-only.
+    """
+    db = active_json_db()
+    if db:
+        key = ('json', db.generation)
+    else:
+        key = ('sql', int(time.time() // TEMPLATE_CACHE_TTL))
+    
+    with _template_cache_lock:
+        if _template_cache['key'] == key:
+            return _template_cache['meals']
+    
+    # Resolved outside the lock, so one slow lookup does not queue every other
+    # request behind it; concurrent cold requests may each resolve, the last publishes
+    queries = list(dict.fromkeys(
+        food_template['query'] for template in MEAL_TEMPLATES for food_template in template['foods']
+    ))
+    if db:
+        # In-memory searches hold the GIL; running them on threads gains nothing
+        search_results_by_query = {query: search_template_food(query, db) for query in queries}
+    else:
+        search_results_by_query = asyncio.run(search_template_foods(queries, db))
+    meals = {}
+    for template in MEAL_TEMPLATES:
+        foods, total_nutrients = resolve_template(template, search_results_by_query)
+        meals[template['id']] = (foods, total_nutrients) + template_allergens(template, foods)
+    
+    # In SQL mode an empty lookup may just mean MySQL was unreachable: don't
+    # keep those meals for TEMPLATE_CACHE_TTL (as cached_json skips empty results)
+    if db or all(search_results_by_query.values()):
+        with _template_cache_lock:
+            _template_cache['meals'] = meals
+            _template_cache['key'] = key
+    return meals
+
+# Meal optimizer for the loaded catalog, rebuilt when the JSON database reloads
+_meal_optimizer = {'generation': None, 'optimizer': None}
+_meal_optimizer_lock = threading.Lock()
+
+def get_meal_optimizer(db):
+    """MealOptimizer over the JSON database db, built on first use"""
+    with _meal_optimizer_lock:
+        if _meal_optimizer['generation'] != db.generation:
+            optimizer = MealOptimizer(db.nutrient_values, NUTRIENT_COLUMNS['calories'])
+            if db is not json_db:
+                # A request still running on a swapped-out database: don't cache for it
+                return optimizer
+            _meal_optimizer['optimizer'] = optimizer
+            _meal_optimizer['generation'] = db.generation
+        return _meal_optimizer['optimizer']
+
+# Request metrics (see metrics.py); the profiler only runs when PROFILE_SAMPLE_INTERVAL is set
+profiler = metrics.SamplingProfiler(PROFILE_SAMPLE_INTERVAL) if PROFILE_SAMPLE_INTERVAL > 0 else None
+
+metrics.registry.add_gauges('result_cache', result_cache.stats)
+if USE_JSON_DB:
+    metrics.registry.add_gauges('json_db', lambda: {
+        'foods': len(json_db.foods), 'generation': json_db.generation
+    } if json_db else {})
+    metrics.registry.add_gauges('reload', catalog_reloader.status)
+else:
+    metrics.registry.add_gauges('db_pool', db_pool.stats)
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    if profiler:
+        # Started here rather than at import, so each gunicorn worker runs its own
+        profiler.start()
+        profiler.begin(request.url_rule.rule if request.url_rule else 'unmatched')
+
+@app.after_request
+def record_request_metrics(response):
+    start = g.get('request_start')
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.registry.requests.observe(
+            time.perf_counter() - start, request.method, route, response.status_code
+        )
+    return response
+
+@app.teardown_request
+def end_request_profile(error=None):
+    if profiler:
+        profiler.end()
+
+def check_admin_token():
+    """None when the request carries ADMIN_TOKEN ("Authorization: Bearer <token>"), else an error response"""
+    if not ADMIN_TOKEN:
+        return jsonify({'error': 'Admin endpoints are disabled; set ADMIN_TOKEN to enable them'}), 403
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer':
+        token = ''
+    if not hmac.compare_digest(token.strip().encode(), ADMIN_TOKEN.encode()):
+        return jsonify({'error': 'Invalid admin token'}), 401
+    return None
+
 # API Routes
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     db_mode = 'JSON' if USE_JSON_DB else 'SQL'
     json_available = json_db is not None
-    return jsonify({
+    health = {
         'status': 'ok',
         'mode': db_mode,
         'json_db_available': json_available,
         'backend': 'Python/Flask'
-    })
+    }
+    if not USE_JSON_DB or (catalog_ready.is_set() and not json_db):
+        health['db_pool'] = db_pool.stats()
+        health['food_summary'] = _food_summary_state['available']
+    if catalog_reloader:
+        health['catalog'] = catalog_status()
+        health['reload'] = catalog_reloader.status()
+    health['result_cache'] = result_cache.stats()
+    # ?ready=1 for readiness probes: 503 until the catalog has loaded
+    if request.args.get('ready') and USE_JSON_DB and not catalog_ready.is_set():
+        health['status'] = 'loading'
+        return jsonify(health), 503
+    return jsonify(health)
+
+@app.route('/api/admin/reload', methods=['POST'])
+def reload_catalog():
+    """
+    Reload usda_foods.json in the background and swap it in when ready
+    (under gunicorn, the master does and then replaces the workers).
+    Requires ADMIN_TOKEN, sent as "Authorization: Bearer <token>".
+    """
+    error = check_admin_token()
+    if error:
+        return error
+    if not catalog_reloader:
+        return jsonify({'error': 'Reloading requires the JSON database'}), 501
+    
+    if reload_signal is not None:
+        # A worker reloading only its own copy would un-share the catalog and
+        # leave workers on different versions: the master reloads it and
+        # then replaces the workers
+        os.kill(os.getppid(), reload_signal)
+        return jsonify({'state': 'queued', 'reloads_in': 'master'}), 202
+    
+    return jsonify(catalog_reloader.request()), 202
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Request latency histograms, span timings, error counts and cache/pool gauges for Prometheus"""
+    return app.response_class(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/metrics/profile', methods=['GET'])
+def get_profile():
+    """
+    Per-route hot spots from the sampling profiler (PROFILE_SAMPLE_INTERVAL),
+    e.g. /api/metrics/profile?top=20&reset=true. Requires ADMIN_TOKEN.
+    """
+    error = check_admin_token()
+    if error:
+        return error
+    if not profiler:
+        return jsonify({'error': 'Profiling is disabled; set PROFILE_SAMPLE_INTERVAL to enable it'}), 404
+    
+    report = profiler.report(top=max(1, min(request.args.get('top', 15, type=int), 100)))
+    if request.args.get('reset', '').lower() in ('1', 'true', 'yes'):
+        profiler.reset()
+    return jsonify(report)
+
+def parse_food_fields(value):
+    """?fields=id,name,protein as a tuple of field names (None for all); ValueError on unknown names"""
+    fields = tuple(dict.fromkeys(field.strip() for field in value.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in FOOD_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(FOOD_FIELDS)}")
+    return fields or None
+
+def stream_foods_ndjson(page, after=None, limit=None):
+    """
+    Yield foods from page(after, size) as NDJSON (one object per line), a
+    batch at a time, so memory stays flat however many foods are exported
+    """
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = EXPORT_BATCH_SIZE if remaining is None else min(EXPORT_BATCH_SIZE, remaining)
+        foods, after = page(after, size)
+        if foods:
+            yield ''.join(app.json.dumps(food, separators=(',', ':')) + '\n' for food in foods)
+        if remaining is not None:
+            remaining -= len(foods)
+        if after is None:
+            return
 
 @app.route('/api/foods', methods=['GET'])
 def get_all_foods():
-    """Get all foods (limited to 50)"""
-    if USE_JSON_DB and json_db:
-        results = json_db.get_all(limit=50)
-    else:
-        # SQL query to get all foods
-        connection = get_db_connection()
-        if not connection:
-            return jsonify([])
-        
+    """
+    List foods in fdcId order, a page at a time, e.g.
+    /api/foods?limit=100&after=<cursor>&fields=id,name,protein. The
+    X-Next-Cursor header carries the next page's cursor (absent on the
+    last page). ?format=ndjson streams every food after the cursor (up to
+    ?limit, if given) as one JSON object per line.
+    """
+    try:
+        fields = parse_food_fields(request.args.get('fields', ''))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    # Read once, so a stream finishes on the catalog it started on even across a reload
+    db = active_json_db()
+    
+    after = request.args.get('after')
+    if after is not None:
         try:
-            cursor = connection.cursor(dictionary=True)
-            sql_query = """
-                SELECT DISTINCT
-                    f.fdc_id as id,
-                    f.description as name,
-                    '100 g' as unit,
-                    MAX(CASE WHEN n.nutrient_id = 208 THEN fn.amount END) as calories,
-                    MAX(CASE WHEN n.nutrient_id = 203 THEN fn.amount END) as protein,
-                    MAX(CASE WHEN n.nutrient_id = 205 THEN fn.amount END) as carbs,
-                    MAX(CASE WHEN n.nutrient_id = 204 THEN fn.amount END) as fat,
-                    MAX(CASE WHEN n.nutrient_id = 291 THEN fn.amount END) as fiber,
-                    MAX(CASE WHEN n.nutrient_id = 269 THEN fn.amount END) as sugar,
-                    MAX(CASE WHEN n.nutrient_id = 301 THEN fn.amount END) as calcium,
-                    MAX(CASE WHEN n.nutrient_id = 303 THEN fn.amount END) as iron,
-                    MAX(CASE WHEN n.nutrient_id = 304 THEN fn.amount END) as magnesium,
-                    MAX(CASE WHEN n.nutrient_id = 305 THEN fn.amount END) as phosphorus,
-                    MAX(CASE WHEN n.nutrient_id = 306 THEN fn.amount END) as potassium,
-                    MAX(CASE WHEN n.nutrient_id = 307 THEN fn.amount END) as sodium,
-                    MAX(CASE WHEN n.nutrient_id = 309 THEN fn.amount END) as zinc,
-                    MAX(CASE WHEN n.nutrient_id = 320 THEN fn.amount END) as vitaminA,
-                    MAX(CASE WHEN n.nutrient_id = 401 THEN fn.amount END) as vitaminC,
-                    MAX(CASE WHEN n.nutrient_id = 328 THEN fn.amount END) as vitaminD,
-                    MAX(CASE WHEN n.nutrient_id = 323 THEN fn.amount END) as vitaminE,
-                    MAX(CASE WHEN n.nutrient_id = 430 THEN fn.amount END) as vitaminK,
-                    MAX(CASE WHEN n.nutrient_id = 415 THEN fn.amount END) as vitaminB6,
-                    MAX(CASE WHEN n.nutrient_id = 418 THEN fn.amount END) as vitaminB12,
-                    MAX(CASE WHEN n.nutrient_id = 417 THEN fn.amount END) as folate,
-                    MAX(CASE WHEN n.nutrient_id = 406 THEN fn.amount END) as niacin
-                FROM food f
-                JOIN food_nutrient fn ON f.fdc_id = fn.fdc_id
-                JOIN nutrient n ON fn.nutrient_id = n.id
-                GROUP BY f.fdc_id, f.description
-                LIMIT 50
-            """
-            cursor.execute(sql_query)
-            results = cursor.fetchall()
-            
-            for row in results:
-                for key in row:
-                    if key not in ('id', 'name', 'unit') and row[key] is None:
-                        row[key] = 0.0
-        finally:
-            if connection.is_connected():
-                cursor.close()
-                connection.close()
+            after = int(after)
+        except ValueError:
+            # A JSON catalog may carry non-numeric fdcIds, which page after the numeric ones
+            if not db:
+                return jsonify({'error': 'after must be an fdcId (the X-Next-Cursor of the previous page)'}), 400
+    
+    def page(after, limit):
+        if db:
+            return db.page(after, limit, fields)
+        return page_foods_sql(after, limit, fields)
     
+    if request.args.get('format') == 'ndjson':
+        limit = request.args.get('limit', type=int)
+        return app.response_class(stream_foods_ndjson(page, after, limit), mimetype='application/x-ndjson')
+    
+    limit = max(1, min(request.args.get('limit', 50, type=int), MAX_PAGE_SIZE))
+    foods, next_cursor = page(after, limit)
+    response = jsonify(foods)
+    if next_cursor is not None:
+        response.headers['X-Next-Cursor'] = str(next_cursor)
+    return response
+
+@app.route('/api/foods/rank', methods=['GET'])
+def rank_foods():
+    """
+    Rank foods by a nutrient column, e.g.
+    /api/foods/rank?sort=iron&per=calories&sodium_lt=140&protein_gt=10&limit=20
+    """
+    db = active_json_db()
+    if not db:
+        return jsonify({'error': 'Ranking requires the JSON database'}), 501
+
+    sort_by = request.args.get('sort', 'protein')
+    per = request.args.get('per') or None
+    descending = request.args.get('order', 'desc').lower() != 'asc'
+    limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+
+    # Filters are passed as <nutrient>_<op>=<value>, e.g. sodium_lt=140
+    filters = []
+    for key, value in request.args.items():
+        name, _, op = key.rpartition('_')
+        if name in NUTRIENT_COLUMNS and op in FILTER_OPS:
+            filters.append((name, op, safe_float(value)))
+
+    try:
+        results = db.rank(sort_by, per=per, filters=filters, descending=descending, limit=limit)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
     return jsonify(results)
 
+@app.route('/api/foods/<int:food_id>', methods=['GET'])
+def get_food(food_id):
+    """Get a single food by fdcId"""
+    def compute(db):
+        if db:
+            return db.get_by_id(food_id)
+        results = get_foods_by_ids_sql([food_id])
+        return results[0] if results else None
+    
+    response = cached_json(('food', food_id), compute)
+    if response is None:
+        return jsonify({'error': 'Not found'}), 404
+    return response
+
+@app.route('/api/foods/<int:food_id>/similar', methods=['GET'])
+def get_similar_foods(food_id):
+    """
+    Foods with the closest nutrient profile, e.g. substitutes for spinach:
+    /api/foods/<id>/similar?limit=10 (add exact=true to skip the index)
+    """
+    if not active_json_db():
+        return jsonify({'error': 'Similar foods require the JSON database'}), 501
+    
+    limit = max(1, min(request.args.get('limit', 10, type=int), MAX_SIMILAR))
+    exact = request.args.get('exact', '').lower() in ('1', 'true', 'yes')
+    
+    response = cached_json(('similar', food_id, limit, exact),
+                           lambda db: db.similar(food_id, limit, exact=exact))
+    if response is None:
+        return jsonify({'error': 'Not found'}), 404
+    return response
+
+@app.route('/api/foods/batch', methods=['GET'])
+def get_foods_batch():
+    """Get several foods by fdcId, e.g. /api/foods/batch?ids=1,2,3"""
+    food_ids = []
+    for part in request.args.get('ids', '').split(','):
+        try:
+            food_ids.append(int(part))
+        except ValueError:
+            continue
+    food_ids = list(dict.fromkeys(food_ids))[:MAX_BATCH_IDS]
+    
+    def compute(db):
+        if db:
+            return db.get_many(food_ids)
+        # Restore request order; IN (...) returns rows in any order
+        by_id = {row['id']: row for row in get_foods_by_ids_sql(food_ids)}
+        return [by_id[food_id] for food_id in food_ids if food_id in by_id]
+    
+    return cached_json(('batch', tuple(food_ids)), compute)
+
 @app.route('/api/foods/search/<query>', methods=['GET'])
 def search_foods(query):
     """Search for foods by query string"""
     if not query or len(query) < 2:
         return jsonify([])
     
-    if USE_JSON_DB and json_db:
-        results = search_foods_json(query)
-    else:
-        results = search_foods_sql(query)
+    def compute(db):
+        if db:
+            return search_foods_json(query, db)
+        return search_foods_sql(query)
+    
+    return cached_json(('search', normalize_query(query), 20), compute)
+
+@app.route('/api/foods/suggest', methods=['GET'])
+def suggest_foods():
+    """
+    Autocomplete for the search box, e.g. /api/foods/suggest?prefix=chick
+    Returns only id and name; fetch the full food by id on selection.
+    """
+    prefix = request.args.get('prefix', '').strip()
+    limit = max(1, min(request.args.get('limit', MAX_SUGGESTIONS, type=int), MAX_SUGGESTIONS))
+    if not prefix:
+        return jsonify([])
+    
+    def compute(db):
+        if db:
+            return db.suggest(prefix, limit)
+        return suggest_foods_sql(prefix, limit)
+    
+    return cached_json(('suggest', normalize_query(prefix), limit), compute)
+
+@app.route('/api/nutrients/totals', methods=['POST'])
+def nutrient_totals():
+    """
+    Total the nutrients of logged items, e.g.
+    {"items": [{"id": 171287, "servingOption": "1 cup", "quantity": 2},
+               {"id": 173944, "gramWeight": 30}]}
+    servingOption may be a label or a serving option object; without one
+    (or gramWeight) an item counts 100 g per unit. quantity defaults to 1.
+    """
+    db = active_json_db()
+    if not db:
+        return jsonify({'error': 'Nutrient totals require the JSON database'}), 501
+    
+    data = request.get_json(silent=True)
+    items = data.get('items') if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        return jsonify({'error': 'Expected a list of items'}), 400
+    if len(items) > MAX_TOTALS_ITEMS:
+        return jsonify({'error': f'At most {MAX_TOTALS_ITEMS} items per request'}), 400
+    
+    parsed = []
+    for item in items:
+        if not isinstance(item, dict):
+            return jsonify({'error': 'Each item must be an object'}), 400
+        try:
+            food_id = int(item.get('id'))
+        except (TypeError, ValueError, OverflowError):
+            return jsonify({'error': f"Invalid food id: {item.get('id')!r}"}), 400
+        
+        serving = item.get('servingOption')
+        if isinstance(serving, dict):
+            # A serving option object as sent to the app
+            grams = serving.get('gramsPerUnit') or serving.get('gramWeight')
+            serving = safe_float(grams) if grams is not None else serving.get('label')
+        if item.get('gramWeight') is not None:
+            serving = safe_float(item['gramWeight'])
+        elif isinstance(serving, str):
+            serving = serving.strip()
+        elif serving is not None:
+            serving = safe_float(serving)
+        
+        quantity = safe_float(item.get('quantity', 1), 1.0)
+        numbers = (quantity,) if serving is None or isinstance(serving, str) else (quantity, serving)
+        if not all(math.isfinite(number) and number >= 0 for number in numbers):
+            return jsonify({'error': 'quantity and gram weights must be finite, non-negative numbers'}), 400
+        
+        parsed.append((food_id, serving, quantity))
+    
+    totals, unknown_ids = db.totals(parsed)
+    return jsonify({
+        'totals': totals,
+        'itemCount': len(parsed) - len(unknown_ids),
+        'unknownIds': unknown_ids
+    })
+
+@app.route('/api/meals/optimize', methods=['POST'])
+def optimize_meals():
+    """
+    Build meals from the whole catalog that close the supplied deficits, e.g.
+    {"deficiencies": [{"nutrient": "iron", "deficit": 8.5}, ...],
+     "allergies": "milk, nuts", "calorieCap": 800, "count": 3}
+    Deficiencies use the same shape as /api/suggest-meals; a missing
+    deficit is taken as target - daily. Meals come back in the
+    /api/suggest-meals format, with portions in units of 100 g.
+    """
+    db = active_json_db()
+    if not db:
+        return jsonify({'error': 'Meal optimization requires the JSON database'}), 501
+    
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    
+    columns_by_name = {name.lower(): column for name, column in NUTRIENT_COLUMNS.items()}
+    names_by_column = {column: name for name, column in NUTRIENT_COLUMNS.items()}
+    deficits = {}
+    for deficiency in data.get('deficiencies') or []:
+        if not isinstance(deficiency, dict):
+            continue
+        column = columns_by_name.get(str(deficiency.get('nutrient', '')).lower())
+        if column is None:
+            continue
+        if deficiency.get('deficit') is not None:
+            amount = safe_float(deficiency['deficit'])
+        else:
+            amount = safe_float(deficiency.get('target')) - safe_float(deficiency.get('daily'))
+        if not math.isfinite(amount):
+            return jsonify({'error': 'deficits must be finite numbers'}), 400
+        if amount > 0:
+            deficits[column] = amount
+    if not deficits:
+        return jsonify([])
+    
+    calorie_cap = safe_float(data.get('calorieCap', 800), 800.0)
+    count = safe_float(data.get('count', 3), 3.0)
+    if not math.isfinite(calorie_cap) or not math.isfinite(count):
+        return jsonify({'error': 'calorieCap and count must be finite numbers'}), 400
+    count = max(1, min(int(count), 8))
+    
+    allergies = data.get('allergies') or ''
+    if not isinstance(allergies, str):
+        return jsonify({'error': 'allergies must be a comma-separated string'}), 400
+    excluded = db.allergen_mask(allergies) if allergies.strip() else None
+    
+    meals = get_meal_optimizer(db).optimize(
+        deficits, calorie_cap, excluded=excluded, count=count, time_budget=MEAL_OPTIMIZER_BUDGET
+    )
+    
+    results = []
+    for number, (picks, covered) in enumerate(meals, start=1):
+        foods = []
+        total_nutrients = dict.fromkeys(MEAL_NUTRIENT_KEYS, 0)
+        rows = [row for row, _ in picks]
+        for food, (_, grams) in zip(db.project(rows, ('id', 'name') + MEAL_NUTRIENT_KEYS), picks):
+            portion = grams / 100.0
+            nutrients = {key: safe_float(food.get(key, 0)) * portion for key in MEAL_NUTRIENT_KEYS}
+            foods.append({
+                'id': food['id'],
+                'name': food['name'],
+                'amount': portion,
+                'unit': '100 g',
+                'nutrients': nutrients
+            })
+            for key in MEAL_NUTRIENT_KEYS:
+                total_nutrients[key] += nutrients[key]
+        
+        coverage = {names_by_column[column]: round(share, 4) for column, share in covered.items()}
+        results.append({
+            'id': f'optimized-{number}',
+            'name': f'Optimized Meal {number}',
+            'category': 'Optimized',
+            'foods': foods,
+            'totalNutrients': total_nutrients,
+            'coverage': coverage,
+            'deficitsCovered': sum(1 for share in covered.values() if share >= 0.99),
+            'score': round(sum(covered.values()) / len(covered), 4)
+        })
     
     return jsonify(results)
 
@@ -312,7 +1075,7 @@ def suggest_meals():
     try:
         data = request.get_json()
         deficiencies = data.get('deficiencies', [])
-        allergies = data.get('allergies', '').lower()
+        allergen_bits, allergen_keywords = allergens.resolve_allergies(data.get('allergies', ''))
         
         if not deficiencies:
             return jsonify([])
@@ -321,59 +1084,24 @@ def suggest_meals():
         deficit_nutrients = set(d['nutrient'].lower() for d in deficiencies)
         
         # Filter and score meal templates
+        with metrics.span('suggest_meals.resolve_templates'):
+            resolved = get_resolved_templates()
         scored_meals = []
-        for template in MEAL_TEMPLATES:
-            # Check allergens
-            if allergies:
-                allergen_keywords = allergies.split(',')
-                template_text = json.dumps(template).lower()
-                if any(allergen.strip() in template_text for allergen in allergen_keywords):
+        with metrics.span('suggest_meals.score_templates'):
+            for template in MEAL_TEMPLATES:
+                # Foods, totals and allergen tags are resolved once per database load
+                foods, total_nutrients, template_bits, template_text = resolved[template['id']]
+                
+                # Check allergens
+                if template_bits & allergen_bits:
+                    continue
+                if any(keyword in template_text for keyword in allergen_keywords):
                     continue
-            
-            # Count how many deficiencies this meal addresses
-            template_nutrients = set(n.lower() for n in template.get('nutrients', []))
-            covered = deficit_nutrients.intersection(template_nutrients)
-            
-            if covered:
-                # Build the meal by searching for foods
-                foods = []
-                total_nutrients = {
-                    'calories': 0, 'protein': 0, 'carbs': 0, 'fat': 0,
-                    'fiber': 0, 'sugar': 0, 'calcium': 0, 'iron': 0,
-                    'magnesium': 0, 'phosphorus': 0, 'potassium': 0,
-                    'sodium': 0, 'zinc': 0, 'vitaminA': 0, 'vitaminC': 0,
-                    'vitaminD': 0, 'vitaminE': 0, 'vitaminK': 0,
-                    'vitaminB6': 0, 'vitaminB12': 0, 'folate': 0, 'niacin': 0
-                }
                 
-                for food_template in template['foods']:
-                    # Search for the food
-                    if USE_JSON_DB and json_db:
-                        search_results = search_foods_json(food_template['query'])
-                    else:
-                        search_results = search_foods_sql(food_template['query'])
-                    
-                    if search_results:
-                        food = search_results[0]
-                        multiplier = food_template['multiplier']
-                        
-                        # Add to foods list
-                        foods.append({
-                            'id': food['id'],
-                            'name': food['name'],
-                            'amount': multiplier,
-                            'unit': food_template['unit'],
-                            'nutrients': {
-                                key: safe_float(food.get(key, 0)) * multiplier
-                                for key in total_nutrients.keys()
-                            }
-                        })
-                        
-                        # Aggregate nutrients
-                        for key in total_nutrients.keys():
-                            total_nutrients[key] += safe_float(food.get(key, 0)) * multiplier
+                # Count how many deficiencies this meal addresses
+                covered = deficit_nutrients.intersection(TEMPLATE_NUTRIENTS[template['id']])
                 
-                if foods:
+                if covered and foods:
                     scored_meals.append({
                         'id': template['id'],
                         'name': template['name'],
@@ -388,8 +1116,11 @@ def suggest_meals():
         scored_meals.sort(key=lambda x: x['score'], reverse=True)
         return jsonify(scored_meals[:8])
         
+    except CatalogNotReady:
+        raise
     except Exception as e:
         print(f"Error in suggest_meals: {e}")
+        metrics.count_error('suggest_meals')
         return jsonify([])
 
 @app.errorhandler(404)
@@ -400,17 +1131,34 @@ def not_found(error):
 def internal_error(error):
     return jsonify({'error': 'Internal server error'}), 500
 
+@app.errorhandler(CatalogNotReady)
+def catalog_not_ready(error):
+    response = jsonify({'error': 'Food catalog is still loading', 'catalog': catalog_status()})
+    response.headers['Retry-After'] = '5'
+    return response, 503
+
+def create_app():
+    """
+    Application factory: starts loading the JSON catalog in the background
+    (and the file watcher) and returns the app right away. Requests that
+    need the catalog wait for it; /api/health answers meanwhile.
+    """
+    start_catalog_load()
+    if USE_JSON_DB and JSON_DB_WATCH_INTERVAL > 0:
+        catalog_reloader.watch(JSON_DB_WATCH_INTERVAL)
+    return app
+
 if __name__ == '__main__':
     print(f"\n{'='*50}")
-    print(f"🐍 Python Backend Server Starting")
+    print("🐍 Python Backend Server Starting")
     print(f"{'='*50}")
     print(f"Mode: {'JSON Database' if USE_JSON_DB else 'MySQL Database'}")
     print(f"Port: {PORT}")
-    print(f"CORS: Enabled")
-    if USE_JSON_DB and json_db:
-        print(f"✓ JSON Database Ready")
-    elif not USE_JSON_DB:
+    print("CORS: Enabled")
+    if USE_JSON_DB:
+        print("JSON Database: loading in the background")
+    else:
         print(f"MySQL Config: {MYSQL_CONFIG['user']}@{MYSQL_CONFIG['host']}/{MYSQL_CONFIG['database']}")
     print(f"{'='*50}\n")
     
-    app.run(host='0.0.0.0', port=PORT, debug=False)
+    create_app().run(host='0.0.0.0', port=PORT, debug=False)
@@ -0,0 +1,129 @@
+"""
+Nearest-neighbor index over food nutrient profiles
+Finds the foods whose 22 nutrient values are closest to a given food's
+"""
+
+import numpy as np
+
+# Hash tables; more of them raise recall and the candidates ranked per query
+TABLES = 8
+
+# Average foods per hash bucket the default bit count aims for
+BUCKET_SIZE = 32
+
+
+def standardize(values):
+    """
+    Per-nutrient scaling of a foods x nutrients array (values per 100 g).
+
+    Amounts are heavily skewed (a few foods carry most of any nutrient), so
+    each column is log-scaled before being centered and divided by its
+    standard deviation. Returns (mean, scale) for standardized_vectors.
+    """
+    logged = np.log1p(np.maximum(np.asarray(values, dtype=np.float64), 0.0))
+    mean = logged.mean(axis=0) if len(logged) else np.zeros(logged.shape[1])
+    scale = logged.std(axis=0) if len(logged) else np.ones(logged.shape[1])
+    scale[scale == 0] = 1.0
+    return mean, scale
+
+
+def standardized_vectors(values, mean, scale):
+    """values as float32 vectors in the space built by standardize"""
+    logged = np.log1p(np.maximum(np.asarray(values, dtype=np.float64), 0.0))
+    return ((logged - mean) / scale).astype(np.float32)
+
+
+class SimilarityIndex:
+    """
+    Random-projection (SimHash) index over standardized nutrient vectors.
+
+    Every table hashes a vector to the signs of its dot products with
+    `bits` random hyperplanes, so foods with similar profiles tend to share
+    a bucket. A query collects its own bucket and the `bits` buckets one
+    bit away in every table, then ranks those candidates by exact
+    Euclidean distance. Per table, `codes` holds the bucket codes sorted
+    and `orders` the matching rows, so a bucket is a searchsorted range.
+    """
+
+    def __init__(self, mean, scale, vectors, projections, codes, orders):
+        self.mean = mean
+        self.scale = scale
+        self.vectors = vectors
+        self.projections = projections  # tables x dimensions x bits
+        self.codes = codes  # tables x foods, sorted per table
+        self.orders = orders  # tables x foods
+
+    @classmethod
+    def build(cls, values, tables=TABLES, bits=None, seed=0):
+        """Index a foods x nutrients array; bits defaults to about BUCKET_SIZE foods per bucket"""
+        mean, scale = standardize(values)
+        vectors = standardized_vectors(values, mean, scale)
+        if bits is None:
+            bits = int(np.clip(np.round(np.log2(max(len(vectors), 1) / BUCKET_SIZE)), 1, 24))
+
+        rng = np.random.default_rng(seed)
+        projections = rng.standard_normal((tables, vectors.shape[1], bits)).astype(np.float32)
+        codes = np.empty((tables, len(vectors)), dtype=np.uint32)
+        orders = np.empty((tables, len(vectors)), dtype=np.int32)
+        for table in range(tables):
+            table_codes = cls._hash(vectors, projections[table])
+            order = np.argsort(table_codes, kind='stable')
+            codes[table] = table_codes[order]
+            orders[table] = order
+        return cls(mean, scale, vectors, projections, codes, orders)
+
+    @staticmethod
+    def _hash(vectors, projection):
+        """Bucket code of each vector: one bit per hyperplane it lies above"""
+        above = (vectors @ projection) > 0
+        return above.astype(np.uint32) @ (np.uint32(1) << np.arange(projection.shape[1], dtype=np.uint32))
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def candidates(self, vector):
+        """Rows sharing a bucket with vector, or one bit away, in any table"""
+        vector = vector[None, :]
+        bits = self.projections.shape[2]
+        flips = np.concatenate(([0], 1 << np.arange(bits))).astype(np.uint32)
+
+        ranges = []
+        for table in range(len(self.projections)):
+            probes = self._hash(vector, self.projections[table])[0] ^ flips
+            starts = np.searchsorted(self.codes[table], probes, side='left')
+            ends = np.searchsorted(self.codes[table], probes, side='right')
+            ranges.extend(self.orders[table][start:end] for start, end in zip(starts, ends) if end > start)
+        if not ranges:
+            return np.arange(0)
+        # Buckets of different tables overlap; a bitmap dedupes faster than sorting
+        seen = np.zeros(len(self.vectors), dtype=bool)
+        seen[np.concatenate(ranges)] = True
+        return np.flatnonzero(seen)
+
+    def _nearest(self, vector, rows, k, exclude):
+        """The k rows closest to vector among rows (None for all), nearest first, with their distances"""
+        if rows is None:
+            rows = np.arange(len(self.vectors))
+            distances = ((self.vectors - vector) ** 2).sum(axis=1)
+        else:
+            distances = ((self.vectors[rows] - vector) ** 2).sum(axis=1)
+        if exclude is not None:
+            keep = rows != exclude
+            rows, distances = rows[keep], distances[keep]
+        if not len(rows):
+            return rows, distances
+        if len(rows) > k:
+            top = np.argpartition(distances, k - 1)[:k]
+            rows, distances = rows[top], distances[top]
+        order = np.lexsort((rows, distances))
+        return rows[order], np.sqrt(distances[order])
+
+    def query(self, row, k=10, exact=False):
+        """
+        The k foods most similar to the food at row (excluding itself), as
+        (rows, distances) nearest first. exact=True compares against every
+        food instead of the hashed candidates.
+        """
+        vector = self.vectors[row]
+        rows = None if exact else self.candidates(vector)
+        return self._nearest(vector, rows, k, exclude=row)
@@ -0,0 +1,196 @@
+"""
+Compiled on-disk snapshot of a JsonDatabase
+Lets the server skip re-parsing usda_foods.json on every start
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import shutil
+
+import numpy as np
+
+from search_index import SearchIndex
+from similar import SimilarityIndex
+
+# Bump when the snapshot layout or the record format changes
+SNAPSHOT_VERSION = 3
+
+META_FILE = 'meta.json'
+RECORDS_FILE = 'records.bin'
+RECORD_OFFSETS_FILE = 'record_offsets.npy'
+NUTRIENT_VALUES_FILE = 'nutrient_values.npy'
+NUTRIENTS_FILE = 'nutrients.npy'
+IDS_FILE = 'ids.npy'
+TOKENS_FILE = 'index_tokens.pkl'
+INDEX_OFFSETS_FILE = 'index_offsets.npy'
+INDEX_POSITIONS_FILE = 'index_positions.npy'
+# SimilarityIndex arrays, by attribute name
+SIMILAR_FILES = {
+    'mean': 'similar_mean.npy',
+    'scale': 'similar_scale.npy',
+    'vectors': 'similar_vectors.npy',
+    'projections': 'similar_projections.npy',
+    'codes': 'similar_codes.npy',
+    'orders': 'similar_orders.npy'
+}
+
+
+def snapshot_path(json_file_path):
+    """Directory holding the snapshot for a JSON file"""
+    return json_file_path + '.snapshot'
+
+
+def file_sha256(path):
+    """Hash a file in chunks so large exports are not read into memory"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class LazyRecords:
+    """
+    Read-only sequence of food records backed by a memory-mapped file.
+    Each record's fields are unpickled on access and passed to record_type,
+    so opening a snapshot costs nothing per food.
+    """
+
+    def __init__(self, path, offsets, record_type):
+        self._record_type = record_type
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self._offsets = offsets
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('record index out of range')
+        start, end = self._offsets[index], self._offsets[index + 1]
+        return self._record_type(*pickle.loads(self._data[start:end]))
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+def _load_array(path):
+    """Memory-map an .npy file, falling back to a full load for object arrays"""
+    try:
+        return np.load(path, mmap_mode='r')
+    except ValueError:
+        return np.load(path, allow_pickle=True)
+
+
+def _source_key(json_file_path):
+    """Cheap identity of the source file (mtime and size)"""
+    stat = os.stat(json_file_path)
+    return {'source_mtime_ns': stat.st_mtime_ns, 'source_size': stat.st_size}
+
+
+def load_snapshot(json_file_path, record_type):
+    """
+    Open the snapshot for json_file_path if it matches the source file.
+    Records are rebuilt as record_type(id, name, portions).
+    A matching mtime and size is trusted as is; otherwise the source is
+    hashed and compared to the hash recorded at build time.
+    Returns a dict of database parts, or None when missing or stale.
+    """
+    directory = snapshot_path(json_file_path)
+    try:
+        with open(os.path.join(directory, META_FILE), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if meta.get('version') != SNAPSHOT_VERSION:
+        return None
+
+    try:
+        key = _source_key(json_file_path)
+        if any(meta.get(name) != value for name, value in key.items()):
+            if meta.get('source_sha256') != file_sha256(json_file_path):
+                return None
+            # Same content with a new mtime (e.g. copied or touched): remember it
+            meta.update(key)
+            _write_meta(directory, meta)
+
+        with open(os.path.join(directory, TOKENS_FILE), 'rb') as f:
+            tokens = pickle.load(f)
+
+        record_offsets = _load_array(os.path.join(directory, RECORD_OFFSETS_FILE))
+        return {
+            'foods': LazyRecords(os.path.join(directory, RECORDS_FILE), record_offsets, record_type),
+            'nutrient_values': _load_array(os.path.join(directory, NUTRIENT_VALUES_FILE)),
+            'nutrient_matrix': _load_array(os.path.join(directory, NUTRIENTS_FILE)),
+            'food_ids': _load_array(os.path.join(directory, IDS_FILE)),
+            'search_index': SearchIndex(
+                tokens,
+                _load_array(os.path.join(directory, INDEX_OFFSETS_FILE)),
+                _load_array(os.path.join(directory, INDEX_POSITIONS_FILE))
+            ),
+            'similarity_index': SimilarityIndex(**{
+                name: _load_array(os.path.join(directory, file_name))
+                for name, file_name in SIMILAR_FILES.items()
+            })
+        }
+    except (OSError, ValueError, pickle.UnpicklingError) as e:
+        print(f"Ignoring unreadable snapshot {directory}: {e}")
+        return None
+
+
+def _write_meta(directory, meta):
+    """Write meta.json (last, so a complete meta marks a complete snapshot)"""
+    with open(os.path.join(directory, META_FILE), 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+
+
+def save_snapshot(json_file_path, db):
+    """Compile db into a snapshot next to json_file_path"""
+    directory = snapshot_path(json_file_path)
+    staging = f"{directory}.tmp-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    try:
+        offsets = [0]
+        with open(os.path.join(staging, RECORDS_FILE), 'wb') as f:
+            for food in db.foods:
+                # Plain tuples, so the snapshot does not depend on the record class's module path
+                blob = pickle.dumps((food.id, food.name, food.portions), protocol=pickle.HIGHEST_PROTOCOL)
+                f.write(blob)
+                offsets.append(offsets[-1] + len(blob))
+        np.save(os.path.join(staging, RECORD_OFFSETS_FILE), np.array(offsets, dtype=np.int64))
+
+        np.save(os.path.join(staging, NUTRIENT_VALUES_FILE), db.nutrient_values)
+        np.save(os.path.join(staging, NUTRIENTS_FILE), db.nutrient_matrix)
+        np.save(os.path.join(staging, IDS_FILE), db.food_ids, allow_pickle=True)
+
+        index = db._search_index
+        with open(os.path.join(staging, TOKENS_FILE), 'wb') as f:
+            pickle.dump(index.tokens, f, protocol=pickle.HIGHEST_PROTOCOL)
+        np.save(os.path.join(staging, INDEX_OFFSETS_FILE), index.offsets)
+        np.save(os.path.join(staging, INDEX_POSITIONS_FILE), index.positions)
+        for name, file_name in SIMILAR_FILES.items():
+            np.save(os.path.join(staging, file_name), getattr(db.similarity_index, name))
+
+        meta = {'version': SNAPSHOT_VERSION, 'count': len(db.foods)}
+        meta.update(_source_key(json_file_path))
+        meta['source_sha256'] = file_sha256(json_file_path)
+        _write_meta(staging, meta)
+
+        # Swap the finished snapshot into place
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(staging, directory)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
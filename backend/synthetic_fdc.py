@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Synthetic USDA FDC catalog generator for benchmarks
+
+Usage:
+    python synthetic_fdc.py synthetic_foods.json --foods 100000 [--seed 0]
+
+Writes a FoundationFoods-style export with FDC-like descriptions
+("Chicken, breast, roasted"), per-category nutrient profiles with noise,
+both nutrient reference shapes found in real exports (nutrientId/value
+and nutrient.number/amount) and a few foodPortions per food. The same
+count and seed always produce the same file, so benchmark runs on
+different commits see identical data.
+"""
+
+import argparse
+import json
+import random
+import sys
+
+from nutrients import NUTRIENT_CODE_MAP
+
+# Category -> (base foods, typical values per 100 g by nutrient name)
+CATEGORIES = {
+    'poultry': (
+        ('Chicken, breast', 'Chicken, thigh', 'Chicken, wing', 'Turkey, breast', 'Duck'),
+        {'calories': 190, 'protein': 27, 'fat': 8, 'iron': 1.2, 'zinc': 2.0, 'niacin': 9, 'vitaminB6': 0.5,
+         'phosphorus': 210, 'potassium': 250, 'sodium': 80, 'vitaminB12': 0.4, 'magnesium': 25}
+    ),
+    'meat': (
+        ('Beef, lean', 'Beef, ground', 'Pork, loin', 'Lamb', 'Veal'),
+        {'calories': 240, 'protein': 26, 'fat': 15, 'iron': 2.6, 'zinc': 5.5, 'niacin': 6, 'vitaminB12': 2.5,
+         'phosphorus': 200, 'potassium': 320, 'sodium': 65, 'vitaminB6': 0.4, 'magnesium': 22}
+    ),
+    'fish': (
+        ('Salmon', 'Tuna', 'Cod', 'Trout', 'Shrimp', 'Sardines'),
+        {'calories': 160, 'protein': 23, 'fat': 6, 'vitaminD': 10, 'vitaminB12': 4, 'niacin': 8,
+         'phosphorus': 250, 'potassium': 380, 'sodium': 90, 'magnesium': 30, 'calcium': 20, 'iron': 0.6}
+    ),
+    'dairy': (
+        ('Milk', 'Yogurt, greek', 'Cheese, cheddar', 'Cheese, mozzarella', 'Cottage cheese', 'Kefir'),
+        {'calories': 120, 'protein': 9, 'fat': 6, 'carbs': 6, 'sugar': 5, 'calcium': 250, 'vitaminB12': 0.8,
+         'phosphorus': 180, 'potassium': 150, 'sodium': 180, 'vitaminA': 60, 'vitaminD': 1, 'zinc': 1}
+    ),
+    'egg': (
+        ('Egg, whole', 'Egg, white', 'Egg, yolk'),
+        {'calories': 143, 'protein': 13, 'fat': 10, 'vitaminB12': 0.9, 'vitaminD': 2, 'folate': 47,
+         'vitaminA': 160, 'phosphorus': 198, 'potassium': 138, 'sodium': 142, 'iron': 1.8, 'zinc': 1.3}
+    ),
+    'vegetables': (
+        ('Spinach', 'Kale', 'Broccoli', 'Sweet potato', 'Lettuce, romaine', 'Carrots', 'Tomatoes', 'Peppers'),
+        {'calories': 35, 'protein': 2.5, 'carbs': 7, 'fiber': 2.8, 'sugar': 2.5, 'vitaminA': 400, 'vitaminC': 40,
+         'vitaminK': 150, 'folate': 90, 'potassium': 420, 'magnesium': 45, 'iron': 1.5, 'calcium': 70}
+    ),
+    'fruits': (
+        ('Blueberries', 'Strawberries', 'Banana', 'Apple', 'Avocado', 'Oranges', 'Mango'),
+        {'calories': 65, 'protein': 0.8, 'carbs': 16, 'fiber': 2.6, 'sugar': 11, 'vitaminC': 35,
+         'potassium': 250, 'folate': 20, 'vitaminK': 10, 'magnesium': 15, 'vitaminE': 0.6}
+    ),
+    'grains': (
+        ('Rice, brown', 'Rice, white', 'Quinoa', 'Oatmeal', 'Bread, whole wheat', 'Tortilla, whole wheat',
+         'Pasta', 'Barley'),
+        {'calories': 180, 'protein': 6, 'carbs': 36, 'fiber': 3.5, 'fat': 2, 'magnesium': 60, 'iron': 1.8,
+         'phosphorus': 150, 'niacin': 3, 'folate': 30, 'zinc': 1.4, 'sodium': 120, 'vitaminB6': 0.15}
+    ),
+    'legumes': (
+        ('Lentils', 'Beans, black', 'Chickpeas', 'Tofu', 'Edamame', 'Peas, split'),
+        {'calories': 130, 'protein': 9, 'carbs': 20, 'fiber': 7, 'iron': 3, 'folate': 180, 'magnesium': 45,
+         'potassium': 370, 'phosphorus': 180, 'zinc': 1.2, 'calcium': 35}
+    ),
+    'nuts': (
+        ('Almonds', 'Walnuts', 'Peanuts', 'Cashews', 'Seeds, chia', 'Seeds, sunflower', 'Peanut butter'),
+        {'calories': 590, 'protein': 20, 'fat': 50, 'carbs': 20, 'fiber': 10, 'vitaminE': 15, 'magnesium': 250,
+         'phosphorus': 450, 'potassium': 650, 'calcium': 150, 'iron': 3.5, 'zinc': 3}
+    ),
+    'fats': (
+        ('Oil, olive', 'Oil, canola', 'Butter', 'Margarine'),
+        {'calories': 850, 'fat': 95, 'vitaminE': 12, 'vitaminK': 40, 'vitaminA': 100, 'sodium': 20}
+    ),
+    'snacks': (
+        ('Crackers', 'Chips, potato', 'Cookies', 'Granola bar', 'Popcorn', 'Pretzels'),
+        {'calories': 470, 'protein': 7, 'carbs': 62, 'fat': 21, 'sugar': 14, 'fiber': 3.5, 'sodium': 520,
+         'iron': 2.5, 'potassium': 200, 'magnesium': 40}
+    ),
+}
+
+PREPARATIONS = ('raw', 'cooked', 'boiled', 'roasted', 'baked', 'fried', 'grilled', 'steamed',
+                'canned', 'frozen', 'dried', 'drained', 'without salt', 'with salt')
+QUALIFIERS = ('whole', 'lean', 'low fat', 'nonfat', 'organic', 'plain', 'unsweetened', 'sweetened',
+              'skinless', 'boneless', 'meat only', 'fresh', 'enriched', 'fortified', 'mixed')
+BRANDS = ('GREAT VALUE', 'KIRKLAND', "TRADER JOE'S", 'KROGER', 'SIGNATURE SELECT', 'HEB', 'MARKET PANTRY')
+PORTIONS = (('cup', 1.0, 1.0), ('tbsp', 1.0, 0.0625), ('oz', 1.0, 0.1181), ('slice', 1.0, 0.25),
+            ('piece', 1.0, 0.4), ('serving', 1.0, 0.6), ('cup', 0.5, 0.5))
+
+NUTRIENT_NAME_CODES = {name: code for code, name in NUTRIENT_CODE_MAP.items()}
+
+# Share of foods that are branded products (upper-case descriptions, brand suffix)
+BRANDED_SHARE = 0.4
+
+
+def _description(rng, base):
+    """An FDC-style description: base food, then comma-separated details"""
+    details = rng.sample(QUALIFIERS, rng.randint(0, 2)) + rng.sample(PREPARATIONS, rng.randint(0, 2))
+    description = ', '.join([base] + details)
+    if rng.random() < BRANDED_SHARE:
+        description = f"{description.upper()}, {rng.choice(BRANDS)}"
+    return description
+
+
+def _nutrients(rng, profile):
+    """foodNutrients entries scattered around a category profile"""
+    entries = []
+    for name, code in NUTRIENT_NAME_CODES.items():
+        typical = profile.get(name, 0.0)
+        if typical == 0.0 and rng.random() < 0.7:
+            # Real exports omit most nutrients a food has none of
+            continue
+        amount = round(typical * rng.lognormvariate(0, 0.5) if typical else rng.random() * 0.5, 3)
+        if rng.random() < 0.5:
+            entries.append({'nutrientId': code, 'value': amount})
+        else:
+            entries.append({'nutrient': {'number': str(code), 'name': name, 'unitName': 'g'}, 'amount': amount})
+    rng.shuffle(entries)
+    return entries
+
+
+def _portions(rng, density):
+    """0-3 foodPortions entries with plausible gram weights"""
+    portions = []
+    for label, amount, cups in rng.sample(PORTIONS, rng.randint(0, 3)):
+        portions.append({
+            'amount': amount,
+            'modifier': label,
+            'portionDescription': f"{amount:g} {label}",
+            'gramWeight': round(240 * cups * density, 1)
+        })
+    return portions
+
+
+def generate_foods(count, seed=0, first_id=100000):
+    """Yield count synthetic FDC foods; the same count and seed give the same foods"""
+    rng = random.Random(seed)
+    categories = list(CATEGORIES.values())
+    for i in range(count):
+        bases, profile = categories[i % len(categories)]
+        yield {
+            'fdcId': first_id + i,
+            'description': _description(rng, rng.choice(bases)),
+            'dataType': 'Foundation',
+            'foodNutrients': _nutrients(rng, profile),
+            'foodPortions': _portions(rng, rng.uniform(0.4, 1.2))
+        }
+
+
+def write_catalog(path, count, seed=0):
+    """Stream count foods to path as {"FoundationFoods": [...]} without holding them in memory"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"FoundationFoods": [')
+        for i, food in enumerate(generate_foods(count, seed)):
+            if i:
+                f.write(',\n')
+            f.write(json.dumps(food, separators=(',', ':')))
+        f.write(']}\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write a synthetic FDC-format food catalog')
+    parser.add_argument('output', help='JSON file to write')
+    parser.add_argument('--foods', type=int, default=100000, help='number of foods')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    write_catalog(args.output, args.foods, args.seed)
+    print(f"Wrote {args.foods} foods to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+Shared fixtures for the backend tests
+
+    cd backend && python -m pytest
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# server.py picks its backend at import
+os.environ['USE_JSON_DB'] = 'true'
+
+
+def make_food(fdc_id, description, nutrients=None, portions=None):
+    """A raw FDC food; nutrients maps nutrient numbers to amounts, e.g. {203: 20.0}"""
+    return {
+        'fdcId': fdc_id,
+        'description': description,
+        'foodNutrients': [
+            {'nutrient': {'number': str(number)}, 'amount': amount}
+            for number, amount in (nutrients or {}).items()
+        ],
+        'foodPortions': portions or []
+    }
+
+
+SAMPLE_FOODS = [
+    make_food(1001, 'Egg, whole, raw', {208: 143, 203: 12.6, 204: 9.5, 301: 56, 303: 1.75}),
+    make_food(1002, 'Eggplant, raw', {208: 25, 203: 1.0, 205: 5.9, 291: 3.0}),
+    make_food(1003, 'Broccoli, raw', {208: 34, 203: 2.8, 205: 6.6, 291: 2.6, 401: 89.2},
+              [{'amount': 1, 'gramWeight': 91, 'modifier': 'cup, chopped'}]),
+    make_food(1004, 'Milk, whole, 3.25% milkfat', {208: 61, 203: 3.2, 204: 3.3, 301: 113},
+              [{'amount': 1, 'gramWeight': 244, 'modifier': 'cup'}]),
+    make_food(1005, 'Cheese, cheddar', {208: 403, 203: 24.9, 204: 33.1, 301: 721}),
+    make_food(1006, 'Almonds, raw', {208: 579, 203: 21.2, 204: 49.9, 303: 3.7, 304: 270}),
+    make_food(1007, 'Spinach, raw', {208: 23, 203: 2.9, 303: 2.7, 304: 79, 320: 469}),
+    make_food(1008, 'Chicken breast, roasted', {208: 165, 203: 31.0, 204: 3.6, 303: 1.0}),
+    make_food(1009, 'Salmon, Atlantic, raw', {208: 208, 203: 20.4, 204: 13.4, 328: 11.0}),
+    make_food(1010, 'Lentils, boiled', {208: 116, 203: 9.0, 205: 20.1, 291: 7.9, 303: 3.3}),
+]
+
+
+@pytest.fixture
+def write_catalog(tmp_path):
+    """Write foods as an FDC export: layout 'foods', 'FoundationFoods' or 'list'"""
+    def write(foods=SAMPLE_FOODS, layout='foods', name='foods.json'):
+        path = tmp_path / name
+        document = foods if layout == 'list' else {layout: foods}
+        path.write_text(json.dumps(document), encoding='utf-8')
+        return str(path)
+    return write
+
+
+@pytest.fixture
+def sample_db(write_catalog):
+    """JsonDatabase over SAMPLE_FOODS, without a snapshot"""
+    from json_db import JsonDatabase
+    return JsonDatabase(write_catalog(), use_snapshot=False)
+
+
+@pytest.fixture
+def client(sample_db, monkeypatch):
+    """Flask test client serving sample_db"""
+    import server
+    monkeypatch.setattr(server, 'json_db', sample_db)
+    server.catalog_ready.set()
+    return server.app.test_client()
@@ -0,0 +1,67 @@
+"""Allergen bitsets: keyword resolution, description tagging and food masks"""
+
+import numpy as np
+
+from allergens import ALLERGEN_BITS, resolve_allergies, text_bits
+from conftest import SAMPLE_FOODS
+
+
+def excluded_ids(db, allergies):
+    return [SAMPLE_FOODS[row]['fdcId'] for row in np.flatnonzero(db.allergen_mask(allergies))]
+
+
+def test_resolve_groups_and_aliases():
+    bits, other_keywords = resolve_allergies('Dairy,  TREE   nut, nuts')
+    assert bits == ALLERGEN_BITS['milk'] | ALLERGEN_BITS['tree nuts'] | ALLERGEN_BITS['peanut']
+    assert other_keywords == []
+
+
+def test_resolve_keeps_unknown_keywords():
+    bits, other_keywords = resolve_allergies('egg, kiwi fruit, , strawberry')
+    assert bits == ALLERGEN_BITS['egg']
+    assert other_keywords == ['kiwi fruit', 'strawberry']
+    assert resolve_allergies('') == (0, [])
+
+
+def test_text_bits():
+    assert text_bits('Cheese, cheddar') == ALLERGEN_BITS['milk']
+    assert text_bits('Almonds, raw') == ALLERGEN_BITS['tree nuts']
+    assert text_bits('Tuna salad with mayonnaise') == ALLERGEN_BITS['fish'] | ALLERGEN_BITS['egg']
+    assert text_bits('Nuts, brazil nuts') == ALLERGEN_BITS['tree nuts']
+    assert text_bits('Bread, whole wheat') == ALLERGEN_BITS['wheat']
+
+
+def test_text_bits_skips_exceptions_and_word_middles():
+    assert text_bits('Eggplant, raw') == 0
+    assert text_bits('Squash, butternut') == 0
+    assert text_bits('Coconut meat') == 0
+    assert text_bits('Buttermilk') == ALLERGEN_BITS['milk']
+
+
+def test_food_bits_match_text_bits(sample_db):
+    expected = [text_bits(food['description']) for food in SAMPLE_FOODS]
+    assert sample_db.allergen_bits.tolist() == expected
+
+
+def test_allergen_mask(sample_db):
+    assert excluded_ids(sample_db, 'milk') == [1004, 1005]
+    assert excluded_ids(sample_db, 'dairy') == [1004, 1005]
+    assert excluded_ids(sample_db, 'eggs') == [1001]
+    assert excluded_ids(sample_db, 'nuts') == [1006]
+    assert excluded_ids(sample_db, 'seafood') == [1009]
+    assert excluded_ids(sample_db, 'sesame') == []
+
+
+def test_allergen_mask_matches_other_keywords_as_text(sample_db):
+    assert excluded_ids(sample_db, 'spinach') == [1007]
+    assert excluded_ids(sample_db, 'milk, lentil') == [1004, 1005, 1010]
+    assert excluded_ids(sample_db, 'kiwi') == []
+
+
+def test_bits_survive_snapshot(write_catalog):
+    from json_db import JsonDatabase
+    path = write_catalog()
+    built = JsonDatabase(path)
+    loaded = JsonDatabase(path)
+    assert loaded.allergen_bits.tolist() == built.allergen_bits.tolist()
+    assert excluded_ids(loaded, 'dairy, fish') == [1004, 1005, 1009]
@@ -0,0 +1,90 @@
+"""Streaming loader on each FDC export layout"""
+
+import json
+
+import pytest
+
+import fdc_stream
+from fdc_stream import find_food_list, iter_foods
+from json_db import JsonDatabase
+
+from conftest import SAMPLE_FOODS
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    # Refill every few characters, so tokens and strings straddle chunk boundaries
+    monkeypatch.setattr(fdc_stream, 'CHUNK_SIZE', 7)
+
+
+@pytest.mark.parametrize('layout, list_key', [('list', None), ('foods', 'foods'), ('FoundationFoods', 'FoundationFoods')])
+def test_layouts(write_catalog, small_chunks, layout, list_key):
+    path = write_catalog(layout=layout)
+    assert list(iter_foods(path)) == [(list_key, food) for food in SAMPLE_FOODS]
+    assert [food.id for food in JsonDatabase(path, use_snapshot=False).foods] == [food['fdcId'] for food in SAMPLE_FOODS]
+
+
+def test_other_keys_are_skipped(tmp_path, small_chunks):
+    path = tmp_path / 'export.json'
+    document = {
+        'Meta': {'note': 'not [a list] {of foods}', 'nested': [[1, 2], {'foods': 'x'}]},
+        'FoundationFoods': SAMPLE_FOODS[:2],
+        'version': 1.5,
+        'foods': SAMPLE_FOODS[2:4],
+    }
+    path.write_text(json.dumps(document), encoding='utf-8')
+    assert list(iter_foods(str(path))) == (
+        [('FoundationFoods', food) for food in SAMPLE_FOODS[:2]] + [('foods', food) for food in SAMPLE_FOODS[2:4]]
+    )
+    # 'foods' wins over 'FoundationFoods', as in the non-streaming loader
+    assert [food.id for food in JsonDatabase(str(path), use_snapshot=False).foods] == [1003, 1004]
+
+
+def test_unicode_and_escapes(tmp_path, small_chunks):
+    foods = [{'fdcId': 1, 'description': 'Crème brûlée, "café" \\ naïve 🍕\n'}]
+    path = tmp_path / 'unicode.json'
+    path.write_text(json.dumps({'foods': foods}, ensure_ascii=False), encoding='utf-8')
+    assert list(iter_foods(str(path))) == [('foods', foods[0])]
+
+
+def test_progress_callback(write_catalog, small_chunks):
+    path = write_catalog()
+    seen = []
+    list(iter_foods(path, on_chunk=seen.append))
+    assert seen and seen == sorted(seen)
+
+
+@pytest.mark.parametrize('text', ['{"foods": [{"fdcId": 1}', '{"foods": [1, 2]} trailing', '{"foods": [1,, 2]}'])
+def test_malformed_input_raises(tmp_path, text):
+    path = tmp_path / 'bad.json'
+    path.write_text(text, encoding='utf-8')
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_foods(str(path)))
+
+
+def test_malformed_file_loads_nothing(tmp_path):
+    path = tmp_path / 'bad.json'
+    path.write_text('{"foods": [{"fdcId": 1', encoding='utf-8')
+    assert JsonDatabase(str(path), use_snapshot=False).foods == []
+
+
+def test_malformed_food_is_skipped(write_catalog):
+    foods = SAMPLE_FOODS[:2] + [
+        {'fdcId': 5001, 'description': 'Odd amounts', 'foodNutrients': [{'nutrient': {'number': '203'}, 'amount': '<0.1'}],
+         'foodPortions': [{'amount': None, 'gramWeight': None}]},
+        'not a food',
+    ]
+    db = JsonDatabase(write_catalog(foods), use_snapshot=False)
+    assert [food.id for food in db.foods] == [1001, 1002, 5001]
+    assert db.get_by_id(5001)['protein'] == 0.0
+
+
+def test_find_food_list(write_catalog):
+    for layout, list_key in (('list', None), ('foods', 'foods'), ('FoundationFoods', 'FoundationFoods')):
+        path = write_catalog(layout=layout, name=f'{layout}.json')
+        key, offset = find_food_list(path)
+        with open(path, 'rb') as f:
+            raw = f.read()
+        assert key == list_key
+        assert raw[offset - 1:offset] == b'['
+        assert json.loads(raw[offset - 1:].decode('utf-8').rstrip().rstrip('}')) == SAMPLE_FOODS
@@ -0,0 +1,138 @@
+"""Bounds of MealOptimizer and /api/meals/optimize: calories, sizes, portions and exclusions"""
+
+import numpy as np
+import pytest
+
+from meal_optimizer import PORTION_GRAMS, MealOptimizer
+
+CALORIES, IRON, VITAMIN_C, CALCIUM = range(4)
+
+
+@pytest.fixture
+def values():
+    """Random foods x (calories, iron, vitamin C, calcium) per 100 g, some with no calories"""
+    rng = np.random.default_rng(7)
+    values = rng.uniform(0, 1, (400, 4)) * [500, 10, 100, 300]
+    values[::25, CALORIES] = 0
+    return values
+
+
+def meal_calories(values, picks):
+    return sum(values[row, CALORIES] * grams / 100 for row, grams in picks)
+
+
+@pytest.mark.parametrize('calorie_cap', [60, 250, 800])
+def test_meals_stay_within_bounds(values, calorie_cap):
+    deficits = {IRON: 18.0, VITAMIN_C: 90.0, CALCIUM: 1000.0}
+    meals = MealOptimizer(values, CALORIES).optimize(deficits, calorie_cap, count=4, max_foods=3, time_budget=10)
+    assert 0 < len(meals) <= 4
+    
+    used = []
+    for picks, covered in meals:
+        assert 0 < len(picks) <= 3
+        assert meal_calories(values, picks) <= calorie_cap + 1e-9
+        assert all(grams in PORTION_GRAMS for _, grams in picks)
+        assert set(covered) == set(deficits)
+        assert all(0.0 <= share <= 1.0 for share in covered.values())
+        used.extend(row for row, _ in picks)
+    # Alternatives never reuse a food
+    assert len(used) == len(set(used))
+
+
+def test_coverage_matches_picks(values):
+    deficits = {IRON: 5.0, VITAMIN_C: 40.0}
+    (picks, covered), = MealOptimizer(values, CALORIES).optimize(deficits, 800, count=1, time_budget=10)
+    for column, need in deficits.items():
+        supplied = sum(values[row, column] * grams / 100 for row, grams in picks)
+        assert covered[column] == pytest.approx(min(supplied, need) / need)
+
+
+def test_excluded_rows_are_never_picked(values):
+    optimizer = MealOptimizer(values, CALORIES)
+    deficits = {IRON: 18.0, VITAMIN_C: 90.0}
+    first = optimizer.optimize(deficits, 800, count=1, time_budget=10)[0][0]
+    excluded = np.zeros(len(values), dtype=bool)
+    excluded[::2] = True
+    excluded[[row for row, _ in first]] = True
+    
+    meals = optimizer.optimize(deficits, 800, excluded=excluded, count=3, time_budget=10)
+    assert meals
+    assert not any(excluded[row] for picks, _ in meals for row, _ in picks)
+    assert not excluded[optimizer.candidate_rows([IRON, VITAMIN_C], excluded)].any()
+
+
+def test_candidate_rows_per_nutrient(values):
+    optimizer = MealOptimizer(values, CALORIES)
+    rows = optimizer.candidate_rows([IRON], per_nutrient=10)
+    assert len(rows) == 10
+    density = values[:, IRON] / np.maximum(values[:, CALORIES], 40.0)
+    assert set(rows) == set(np.argsort(-density)[:10])
+    assert len(optimizer.candidate_rows([])) == 0
+
+
+def test_nothing_to_build(values):
+    optimizer = MealOptimizer(values, CALORIES)
+    assert optimizer.optimize({IRON: 5.0}, 0) == []
+    assert optimizer.optimize({IRON: 0.0, VITAMIN_C: -3.0}, 800) == []
+    everything = np.ones(len(values), dtype=bool)
+    assert optimizer.optimize({IRON: 5.0}, 800, excluded=everything) == []
+
+
+def test_first_meal_survives_an_expired_budget(values):
+    meals = MealOptimizer(values, CALORIES).optimize({IRON: 18.0}, 800, count=3, time_budget=-1)
+    assert len(meals) == 1
+    assert len(meals[0][0]) == 1
+
+
+def optimize(client, **request):
+    request.setdefault('deficiencies', [{'nutrient': 'iron', 'target': 18, 'daily': 4},
+                                        {'nutrient': 'calcium', 'deficit': 500}])
+    return client.post('/api/meals/optimize', json=request)
+
+
+def test_endpoint(client, monkeypatch):
+    import server
+    monkeypatch.setattr(server, 'MEAL_OPTIMIZER_BUDGET', 10)
+    response = optimize(client, calorieCap=600, count=2, allergies='dairy, almond')
+    assert response.status_code == 200
+    meals = response.get_json()
+    assert 0 < len(meals) <= 2
+    for meal in meals:
+        assert meal['totalNutrients']['calories'] <= 600 + 1e-9
+        assert {food['id'] for food in meal['foods']}.isdisjoint({1004, 1005, 1006})
+        assert all(food['amount'] * 100 in PORTION_GRAMS for food in meal['foods'])
+        assert set(meal['coverage']) == {'iron', 'calcium'}
+        assert all(0.0 <= share <= 1.0 for share in meal['coverage'].values())
+
+
+def test_endpoint_clamps_count(client, monkeypatch):
+    import server
+    counts = []
+    
+    class Optimizer:
+        def optimize(self, deficits, calorie_cap, excluded=None, count=3, **kwargs):
+            counts.append(count)
+            return []
+    
+    monkeypatch.setattr(server, 'get_meal_optimizer', lambda db: Optimizer())
+    for count in (100, 0, -5, 2.9):
+        assert optimize(client, count=count).status_code == 200
+    assert counts == [8, 1, 1, 2]
+
+
+@pytest.mark.parametrize('request_fields', [
+    {'count': 'inf'},
+    {'count': 'nan'},
+    {'calorieCap': '1e400'},
+    {'deficiencies': [{'nutrient': 'iron', 'deficit': 'nan'}]},
+    {'deficiencies': [{'nutrient': 'iron', 'target': 'inf'}]},
+    {'allergies': ['milk']},
+])
+def test_endpoint_rejects_bad_numbers(client, request_fields):
+    assert optimize(client, **request_fields).status_code == 400
+
+
+def test_endpoint_without_deficits(client):
+    response = optimize(client, deficiencies=[{'nutrient': 'iron', 'deficit': 0}, {'nutrient': 'unobtainium'}])
+    assert response.status_code == 200
+    assert response.get_json() == []
@@ -0,0 +1,97 @@
+"""Keyset pagination of /api/foods: cursors, field projection and NDJSON export"""
+
+import json
+
+import pytest
+
+import server
+from json_db import JsonDatabase
+
+from conftest import SAMPLE_FOODS, make_food
+
+SAMPLE_IDS = sorted(food['fdcId'] for food in SAMPLE_FOODS)
+
+
+def all_pages(db, limit, fields=None):
+    ids, after = [], None
+    while True:
+        foods, after = db.page(after, limit, fields)
+        ids.extend(food['id'] for food in foods)
+        if after is None:
+            return ids
+
+
+@pytest.mark.parametrize('limit', [1, 3, 10, 11])
+def test_pages_cover_every_food_once(sample_db, limit):
+    assert all_pages(sample_db, limit) == SAMPLE_IDS
+
+
+def test_cursor_is_last_id_of_page(sample_db):
+    foods, after = sample_db.page(None, 3)
+    assert after == foods[-1]['id'] == SAMPLE_IDS[2]
+    foods, after = sample_db.page(after, 3)
+    assert [food['id'] for food in foods] == SAMPLE_IDS[3:6]
+    # Any id works as a cursor, even one past the end
+    assert sample_db.page(1003, 1)[0][0]['id'] == 1004
+    assert sample_db.page(10**9, 5) == ([], None)
+
+
+def test_last_page_has_no_cursor(sample_db):
+    foods, after = sample_db.page(SAMPLE_IDS[-3], 5)
+    assert len(foods) == 2 and after is None
+
+
+def test_duplicate_ids_page_once(write_catalog):
+    foods = [make_food(3, 'C'), make_food(1, 'A'), make_food(2, 'B'), make_food(1, 'A again')]
+    db = JsonDatabase(write_catalog(foods), use_snapshot=False)
+    assert all_pages(db, 1) == [1, 2, 3]
+    # The first food with an id wins, as in get_by_id
+    assert db.page(None, 1)[0][0]['name'] == 'A'
+
+
+def test_mixed_id_types(write_catalog):
+    foods = [make_food('b-2', 'B'), make_food(20, 'Twenty'), make_food('a-1', 'A'), make_food(3, 'Three')]
+    db = JsonDatabase(write_catalog(foods), use_snapshot=False)
+    db.warm()
+    assert all_pages(db, 1) == [3, 20, 'a-1', 'b-2']
+    assert db.page('a-1', 5)[0][0]['id'] == 'b-2'
+
+
+def test_field_projection(sample_db):
+    foods, _ = sample_db.page(None, 2, ('id', 'protein'))
+    assert foods == [{'id': 1001, 'protein': 12.6}, {'id': 1002, 'protein': 1.0}]
+    full = sample_db.page(None, 1)[0][0]
+    assert full == sample_db.get_by_id(1001)
+
+
+def test_endpoint_follows_cursor_header(client):
+    ids, url = [], '/api/foods?limit=4&fields=id'
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        ids.extend(food['id'] for food in response.get_json())
+        cursor = response.headers.get('X-Next-Cursor')
+        url = f'/api/foods?limit=4&fields=id&after={cursor}' if cursor else None
+    assert ids == SAMPLE_IDS
+
+
+def test_endpoint_rejects_bad_parameters(client):
+    assert client.get('/api/foods?fields=id,bogus').status_code == 400
+
+
+def test_ndjson_export(client, monkeypatch):
+    # Several batches, so the stream has to carry the cursor between them
+    monkeypatch.setattr(server, 'EXPORT_BATCH_SIZE', 3)
+    response = client.get('/api/foods?format=ndjson&fields=id,name')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    lines = response.get_data(as_text=True).splitlines()
+    foods = [json.loads(line) for line in lines]
+    assert [food['id'] for food in foods] == SAMPLE_IDS
+    assert set(foods[0]) == {'id', 'name'}
+
+
+def test_ndjson_export_after_and_limit(client, monkeypatch):
+    monkeypatch.setattr(server, 'EXPORT_BATCH_SIZE', 2)
+    response = client.get(f'/api/foods?format=ndjson&fields=id&after={SAMPLE_IDS[1]}&limit=5')
+    assert [json.loads(line)['id'] for line in response.get_data(as_text=True).splitlines()] == SAMPLE_IDS[2:7]
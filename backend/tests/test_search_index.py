@@ -0,0 +1,82 @@
+"""BM25 ranking and typo-tolerant matching of SearchIndex"""
+
+from search_index import SearchIndex, edit_distance, max_typos
+
+DESCRIPTIONS = [
+    'Eggplant, raw',
+    'Egg, whole, raw',
+    'Chicken breast, roasted, with skin, and gravy, canned',
+    'Chicken, roasted',
+    'Broccoli, raw',
+    'Cheese, cheddar',
+    'Bread, whole wheat',
+]
+
+
+def search(query, limit=20):
+    positions = SearchIndex.build(DESCRIPTIONS).search(query, limit)
+    return None if positions is None else [DESCRIPTIONS[position] for position in positions]
+
+
+def test_every_term_must_match():
+    assert search('egg whole') == ['Egg, whole, raw']
+    assert search('chicken gravy') == ['Chicken breast, roasted, with skin, and gravy, canned']
+
+
+def test_exact_token_outranks_prefix():
+    assert search('egg') == ['Egg, whole, raw', 'Eggplant, raw']
+
+
+def test_shorter_description_ranks_first():
+    # BM25 length normalization: the same token weighs more in a short description
+    assert search('chicken roasted') == ['Chicken, roasted', 'Chicken breast, roasted, with skin, and gravy, canned']
+
+
+def test_rarer_term_decides_ranking():
+    results = search('raw')
+    assert set(results) == {'Eggplant, raw', 'Egg, whole, raw', 'Broccoli, raw'}
+    assert search('whole raw') == ['Egg, whole, raw']
+
+
+def test_limit():
+    assert len(search('raw', limit=2)) == 2
+    assert search('raw', limit=0) == []
+
+
+def test_typo_is_corrected():
+    assert search('brocoli') == ['Broccoli, raw']
+    assert search('chedar cheese') == ['Cheese, cheddar']
+    assert search('chiken roasted')[0] == 'Chicken, roasted'
+
+
+def test_typo_does_not_hide_exact_matches():
+    # "bread" matches as typed, so it is not also read as a typo of "broccoli" or anything else
+    assert search('bread') == ['Bread, whole wheat']
+
+
+def test_short_terms_are_not_corrected():
+    assert max_typos('egx') == 0
+    assert search('egx') == []
+
+
+def test_nothing_indexable():
+    assert search('%%') is None
+
+
+def test_edit_distance():
+    assert edit_distance('broccoli', 'brocoli', 2) == 1
+    assert edit_distance('chicken', 'chikcen', 2) == 1  # adjacent swap
+    assert edit_distance('cheese', 'bread', 1) == 2  # limit + 1 once over the limit
+    assert edit_distance('chick', 'chicken', 1, prefix=True) == 0
+
+
+def test_suggest_prefix():
+    index = SearchIndex.build(DESCRIPTIONS)
+    suggested = [DESCRIPTIONS[position] for position in index.suggest('chi')]
+    assert set(suggested) == {'Chicken, roasted', 'Chicken breast, roasted, with skin, and gravy, canned'}
+
+
+def test_json_database_search(sample_db):
+    assert [food['name'] for food in sample_db.search('spinach')] == ['Spinach, raw']
+    assert sample_db.search('almnds')[0]['id'] == 1006
+    assert sample_db.search('') == []
@@ -0,0 +1,79 @@
+"""Compiled snapshot round trips and invalidation"""
+
+import json
+import os
+
+import numpy as np
+
+import snapshot
+from json_db import FoodRecord, JsonDatabase
+from snapshot import load_snapshot, snapshot_path
+
+from conftest import SAMPLE_FOODS, make_food
+
+
+def assert_same_database(loaded, built):
+    assert len(loaded.foods) == len(built.foods)
+    for a, b in zip(loaded.foods, built.foods):
+        assert (a.id, a.name, a.portions) == (b.id, b.name, b.portions)
+    np.testing.assert_array_equal(loaded.nutrient_values, built.nutrient_values)
+    np.testing.assert_array_equal(loaded.food_ids, built.food_ids)
+    assert loaded.search('raw') == built.search('raw')
+    assert loaded.similar(1001, limit=3) == built.similar(1001, limit=3)
+
+
+def test_round_trip(write_catalog, capsys):
+    path = write_catalog()
+    built = JsonDatabase(path)
+    assert os.path.exists(os.path.join(snapshot_path(path), snapshot.META_FILE))
+    assert 'from snapshot' not in capsys.readouterr().out
+
+    loaded = JsonDatabase(path)
+    assert 'from snapshot' in capsys.readouterr().out
+    assert_same_database(loaded, built)
+
+
+def test_changed_source_invalidates(write_catalog):
+    path = write_catalog()
+    JsonDatabase(path)
+    write_catalog(SAMPLE_FOODS + [make_food(2001, 'Kale, raw', {208: 49})])
+
+    assert load_snapshot(path, FoodRecord) is None
+    db = JsonDatabase(path)
+    assert len(db.foods) == len(SAMPLE_FOODS) + 1
+    assert db.get_by_id(2001)['name'] == 'Kale, raw'
+    # ...and the rebuilt snapshot is current again
+    assert load_snapshot(path, FoodRecord) is not None
+
+
+def test_touched_source_is_revalidated_by_hash(write_catalog):
+    path = write_catalog()
+    JsonDatabase(path)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    assert load_snapshot(path, FoodRecord) is not None
+    with open(os.path.join(snapshot_path(path), snapshot.META_FILE), encoding='utf-8') as f:
+        assert json.load(f)['source_mtime_ns'] == stat.st_mtime_ns + 10**9
+
+
+def test_other_version_is_ignored(write_catalog, monkeypatch):
+    path = write_catalog()
+    JsonDatabase(path)
+    monkeypatch.setattr(snapshot, 'SNAPSHOT_VERSION', snapshot.SNAPSHOT_VERSION + 1)
+    assert load_snapshot(path, FoodRecord) is None
+
+
+def test_unreadable_snapshot_falls_back_to_parsing(write_catalog):
+    path = write_catalog()
+    JsonDatabase(path)
+    os.remove(os.path.join(snapshot_path(path), snapshot.IDS_FILE))
+
+    assert load_snapshot(path, FoodRecord) is None
+    assert len(JsonDatabase(path).foods) == len(SAMPLE_FOODS)
+
+
+def test_without_snapshot(write_catalog):
+    path = write_catalog()
+    JsonDatabase(path, use_snapshot=False)
+    assert not os.path.exists(snapshot_path(path))
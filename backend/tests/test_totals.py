@@ -0,0 +1,73 @@
+"""Nutrient totals over logged items, in JsonDatabase.totals and /api/nutrients/totals"""
+
+import pytest
+
+
+def test_serving_label_and_grams(sample_db):
+    totals, unknown_ids = sample_db.totals([
+        (1003, 'cup, chopped', 2),   # 182 g of broccoli
+        (1004, 244.0, 1),            # a cup of milk as grams per unit
+        (1001, None, 1),             # 100 g of egg
+    ])
+    assert unknown_ids == []
+    assert totals['calories'] == pytest.approx(34 * 1.82 + 61 * 2.44 + 143)
+    assert totals['calcium'] == pytest.approx(113 * 2.44 + 56)
+    assert totals['vitaminC'] == pytest.approx(89.2 * 1.82)
+
+
+def test_default_serving_options(sample_db):
+    totals, _ = sample_db.totals([(1005, 'oz', 2), (1006, 'grams', 30)])
+    assert totals['protein'] == pytest.approx(24.9 * 0.567 + 21.2 * 0.3)
+
+
+def test_unknown_label_counts_100_grams(sample_db):
+    totals, _ = sample_db.totals([(1008, 'slice', 1)])
+    assert totals['protein'] == pytest.approx(31.0)
+
+
+def test_unknown_ids_are_reported(sample_db):
+    totals, unknown_ids = sample_db.totals([(999, None, 1), (1009, None, 1), (998, 'cup', 2)])
+    assert unknown_ids == [999, 998]
+    assert totals['vitaminD'] == pytest.approx(11.0)
+    
+    totals, unknown_ids = sample_db.totals([(999, None, 1)])
+    assert unknown_ids == [999]
+    assert set(totals.values()) == {0.0}
+
+
+def test_endpoint(client):
+    response = client.post('/api/nutrients/totals', json={'items': [
+        {'id': 1004, 'servingOption': 'cup', 'quantity': 2},
+        {'id': '1010', 'gramWeight': 50},
+        {'id': 1003, 'servingOption': {'label': 'cup, chopped', 'gramsPerUnit': 91}},
+        {'id': 42},
+    ]})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['itemCount'] == 3
+    assert body['unknownIds'] == [42]
+    assert body['totals']['calories'] == pytest.approx(61 * 4.88 + 116 * 0.5 + 34 * 0.91)
+
+
+@pytest.mark.parametrize('item', [
+    {'id': 1001, 'quantity': 'nan'},
+    {'id': 1001, 'quantity': 'inf'},
+    {'id': 1001, 'quantity': -1},
+    {'id': 1001, 'gramWeight': '1e400'},
+    {'id': 1001, 'gramWeight': -5},
+    {'id': 1001, 'servingOption': {'gramsPerUnit': '-inf'}},
+    {'id': 1e400},
+    {'id': 'egg'},
+    'egg',
+])
+def test_endpoint_rejects_bad_items(client, item):
+    response = client.post('/api/nutrients/totals', json={'items': [item]})
+    assert response.status_code == 400
+
+
+def test_endpoint_rejects_non_lists(client, monkeypatch):
+    import server
+    assert client.post('/api/nutrients/totals', json={'items': 'egg'}).status_code == 400
+    monkeypatch.setattr(server, 'MAX_TOTALS_ITEMS', 2)
+    items = [{'id': 1001}] * 3
+    assert client.post('/api/nutrients/totals', json=items).status_code == 400
@@ -0,0 +1,13 @@
+"""
+Tokenizer shared by search and allergen matching
+Free of dependencies, so SQL mode can match allergens without the JSON backend
+"""
+
+import re
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text):
+    """Split text into lowercase alphanumeric tokens"""
+    return TOKEN_PATTERN.findall(text.lower())
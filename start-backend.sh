@@ -31,12 +31,31 @@ case $BACKEND_TYPE in
     python server.py
     ;;
   
+  python-prod|py-prod|prod)
+    echo "🐍 Starting Python backend with gunicorn..."
+    echo "Starting ${WEB_CONCURRENCY:-one per core} workers on port ${PORT:-5001}..."
+    
+    if [ ! -d "backend/venv" ]; then
+      echo "Creating Python virtual environment..."
+      cd backend
+      python3 -m venv venv
+      source venv/bin/activate
+      pip install -r requirements.txt
+    else
+      cd backend
+      source venv/bin/activate
+    fi
+    
+    gunicorn -c gunicorn.conf.py 'server:create_app()'
+    ;;
+  
   *)
-    echo "Usage: ./start-backend.sh [node|python]"
+    echo "Usage: ./start-backend.sh [node|python|python-prod]"
     echo ""
     echo "Examples:"
     echo "  ./start-backend.sh node    # Start Node.js backend (port 5000)"
     echo "  ./start-backend.sh python  # Start Python backend (port 5001)"
+    echo "  ./start-backend.sh python-prod  # Python backend on every core via gunicorn"
     exit 1
     ;;
 esac